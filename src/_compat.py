@@ -0,0 +1,30 @@
+"""
+Optional accelerator fallbacks shared across modules.
+
+numba and orjson are optional installs; everything here degrades to a
+plain-Python / stdlib equivalent with the same call signature.
+"""
+import json
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:  # numba is optional — decorated functions run as plain Python
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        return args[0] if args and callable(args[0]) else (lambda f: f)
+
+try:
+    import orjson
+    json_loads = orjson.loads
+
+    def jsonl_line(obj) -> bytes:
+        """One JSON Lines record (newline-terminated bytes)."""
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+except ImportError:  # orjson is optional — stdlib json reads/writes the same payloads
+    json_loads = json.loads
+
+    def jsonl_line(obj) -> bytes:
+        """One JSON Lines record (newline-terminated bytes)."""
+        return (json.dumps(obj) + '\n').encode()
@@ -3,6 +3,7 @@ Archia API Client
 - Chat: Uses Archia's responses endpoint with correct system_name models
 - Embeddings: Uses sentence-transformers locally (Archia has no embedding models)
 """
+import os
 from openai import OpenAI
 from typing import List
 import sys
@@ -39,18 +40,53 @@ class ArchiaClient:
         embedding = self.embedding_model_local.encode(text, normalize_embeddings=True)
         return embedding.tolist()
 
-    def create_embeddings_batch(self, texts: List[str], batch_size: int = 100) -> List[List[float]]:
-        """Create embeddings for multiple texts using local model"""
+    def create_embeddings_batch(self, texts: List[str], batch_size: int = 100,
+                                fp16: bool = False):
+        """
+        Create embeddings for multiple texts using local model.
+        Returns lists of floats by default. With fp16=True the normalized
+        tensor is cast to float16 on the model's device and copied to the
+        host once, returning an (N, dim) float16 ndarray.
+        """
         print(f"🔮 Creating embeddings for {len(texts)} chunks...")
         embeddings = self.embedding_model_local.encode(
             texts,
             batch_size=batch_size,
             normalize_embeddings=True,
-            show_progress_bar=True
+            show_progress_bar=True,
+            convert_to_tensor=fp16,
         )
         print(f"✅ Embeddings complete: {len(embeddings)} vectors")
+        if fp16:
+            return embeddings.half().cpu().numpy()
         return embeddings.tolist()
 
+    def create_embeddings_parallel(self, texts: List[str], batch_size: int = 100):
+        """
+        Embed a large corpus across worker processes (one per GPU when more
+        than one is visible, otherwise half the CPU cores). Returns a float32
+        ndarray in input order.
+        """
+        import torch
+        gpus = torch.cuda.device_count()
+        if gpus > 1:
+            devices = [f"cuda:{i}" for i in range(gpus)]
+        else:
+            devices = ["cpu"] * max(1, (os.cpu_count() or 2) // 2)
+
+        print(f"🔮 Creating embeddings for {len(texts)} chunks on {len(devices)} workers...")
+        pool = self.embedding_model_local.start_multi_process_pool(target_devices=devices)
+        try:
+            embeddings = self.embedding_model_local.encode_multi_process(
+                texts, pool,
+                batch_size=batch_size,
+                normalize_embeddings=True,
+            )
+        finally:
+            self.embedding_model_local.stop_multi_process_pool(pool)
+        print(f"✅ Embeddings complete: {len(embeddings)} vectors")
+        return embeddings.astype("float32", copy=False)
+
     def chat(self, system_prompt: str, user_message: str,
          temperature: float = 0.7, max_tokens: int = 2000) -> str:
          try:
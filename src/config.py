@@ -28,6 +28,9 @@ EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 CHAT_MODEL = "gpt-4.1" 
 EMBEDDING_DIMENSION = 384  # all-MiniLM-L6-v2
 
+# Opt-in GPU FAISS for index builds (set FAISS_USE_GPU=1; needs faiss-gpu)
+FAISS_USE_GPU = os.getenv("FAISS_USE_GPU", "0") == "1"
+
 # RAG Parameters
 CHUNK_SIZE = 500
 CHUNK_OVERLAP = 50
@@ -165,6 +168,7 @@ AGENT_NAMES = {
 
 # File paths
 FAISS_INDEX_PATH = INDEX_DIR / "faiss.index"
-METADATA_PATH = INDEX_DIR / "metadata.pkl"
+METADATA_PATH = INDEX_DIR / "metadata.pkl"          # legacy / no-pyarrow fallback
+METADATA_ARROW_PATH = INDEX_DIR / "metadata.arrow"  # memory-mapped chunk table
 DOCSTORE_PATH = INDEX_DIR / "docstore.jsonl"
 CRIME_DATA_PATH = CRIME_DATA_DIR / "crime_data_clean.csv"
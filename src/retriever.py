@@ -9,7 +9,7 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 from src.config import TOP_K_DOCUMENTS
 from src.archia_client import ArchiaClient
-from src.vector_index import VectorIndexBuilder
+from src.vector_index import VectorIndexBuilder, get_faiss
 
 
 class DocumentRetriever:
@@ -50,16 +50,23 @@ class DocumentRetriever:
         if not query_embedding:
             return []
         
-        # Convert to numpy array
+        # Convert to numpy array (unit length, matching the indexed vectors)
+        faiss = get_faiss()   # already loaded by load_index; lazy for plain importers
         query_vector = np.array([query_embedding], dtype='float32')
+        faiss.normalize_L2(query_vector)
         
         # Search FAISS index
         distances, indices = self.index.search(query_vector, top_k)
         
+        # Inner-product indexes return cosine similarity; for unit vectors the
+        # squared L2 distance older flat-L2 indexes reported is 2 - 2·cos
+        if self.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+            distances = 2 - 2 * distances
+        
         # Compile results
         results = []
         for i, (dist, idx) in enumerate(zip(distances[0], indices[0])):
-            if idx >= len(self.chunks):
+            if idx < 0 or idx >= len(self.chunks):
                 continue
             
             # Convert distance to similarity score
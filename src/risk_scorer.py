@@ -19,7 +19,7 @@ import math
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 import sys
 
 sys.path.append(str(Path(__file__).parent.parent))
@@ -125,6 +125,39 @@ class RiskScorer:
         nearby['_dist'] = nearby.apply(haversine_row, axis=1)
         return nearby[nearby['_dist'] <= radius_miles]
 
+    def _incidents_near_batch(self, lats, lons,
+                              radius_miles: float = 0.15) -> List[pd.DataFrame]:
+        """
+        _incidents_near for many points at once: one (points x records)
+        bounding-box + haversine pass instead of a row-wise apply per point.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        df = self.crime_data
+        if (df is None or df.empty or
+                'lat' not in df.columns or 'lon' not in df.columns):
+            return [pd.DataFrame() for _ in range(len(lats))]
+
+        rec_lat = df['lat'].to_numpy(dtype=np.float64)
+        rec_lon = df['lon'].to_numpy(dtype=np.float64)
+        q_lat, q_lon = lats[:, None], lons[:, None]
+
+        # Same rough bounding box as _incidents_near, then exact haversine
+        dlat_box = radius_miles / 69.0
+        dlon_box = radius_miles / (69.0 * np.cos(np.radians(q_lat)))
+        in_box = ((rec_lat >= q_lat - dlat_box) & (rec_lat <= q_lat + dlat_box) &
+                  (rec_lon >= q_lon - dlon_box) & (rec_lon <= q_lon + dlon_box))
+
+        dlat = np.radians(rec_lat - q_lat)
+        dlon = np.radians(rec_lon - q_lon)
+        a = (np.sin(dlat/2)**2 +
+             np.cos(np.radians(q_lat)) * np.cos(np.radians(rec_lat)) *
+             np.sin(dlon/2)**2)
+        dist = 3959.0 * 2 * np.arcsin(np.sqrt(np.maximum(0, a)))
+        within = in_box & (dist <= radius_miles)
+
+        return [df[row] for row in within]
+
     def _base_score(self, incidents: pd.DataFrame) -> float:
         """
         Compute base risk score (0-7.5) from incident count and severity.
@@ -194,7 +227,14 @@ class RiskScorer:
           base_score     : float (crime-only component, 0-7.5)
           temporal_bonus : float (time component, 0-2.5)
         """
-        incidents   = self._incidents_near(lat, lon)
+        return self._detail_from_incidents(self._incidents_near(lat, lon), hour)
+
+    def get_risk_detail_batch(self, lats, lons, hour: int = 12) -> List[Dict]:
+        """get_risk_detail for many points; incident lookup runs as one batch."""
+        return [self._detail_from_incidents(incidents, hour)
+                for incidents in self._incidents_near_batch(lats, lons)]
+
+    def _detail_from_incidents(self, incidents: pd.DataFrame, hour: int) -> Dict:
         base        = self._base_score(incidents)
         t_bonus     = self._temporal_bonus(incidents, hour)
         total_score = round(min(10.0, base + t_bonus), 2)
@@ -18,9 +18,14 @@ Research database compiled from:
   - Urban lighting research (Cambridge, Welsh & Farrington 2008)
 """
 
+import io
+from fractions import Fraction
+from functools import lru_cache
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, field
 
+import numpy as np
+
 # ── National cost benchmarks ──────────────────────────────────────────────────
 # Cost per campus incident (legal, medical, security response, reputation)
 COST_PER_INCIDENT = {
@@ -133,6 +138,26 @@ RESEARCH_CITATIONS = {
     ],
 }
 
+# Column-store view of the citation numbers: category → (medians, lows, highs).
+# ROI math reads these arrays; the prose rows above are only used for display.
+_CITE_NUM = {
+    cat: (
+        np.array([c['median_reduction'] for c in cites], dtype=np.int64),
+        np.array([c['reduction_range'][0] for c in cites], dtype=np.int64),
+        np.array([c['reduction_range'][1] for c in cites], dtype=np.int64),
+    )
+    for cat, cites in RESEARCH_CITATIONS.items()
+}
+
+
+def _safe_div(num, den, fallback: float) -> np.ndarray:
+    """Branch-free num / den that yields ``fallback`` wherever den <= 0."""
+    num = np.asarray(num, dtype=np.float64)
+    den = np.asarray(den, dtype=np.float64)
+    out = np.full(np.broadcast(num, den).shape, fallback, dtype=np.float64)
+    np.divide(num, den, out=out, where=den > 0)
+    return out
+
 # ── Intervention cost database ────────────────────────────────────────────────
 INTERVENTION_COSTS = {
     'led_light_pole': {
@@ -255,21 +280,45 @@ class Intervention:
 
     @property
     def median_reduction_pct(self) -> float:
-        cites = self.citations
-        if not cites:
-            return 20.0
-        return sum(c['median_reduction'] for c in cites) / len(cites)
+        return float(_category_stats(self.research_category)[2])
 
     @property
     def reduction_range(self) -> Tuple:
-        cites = self.citations
-        if not cites:
-            return (15, 30)
-        low  = min(c['reduction_range'][0] for c in cites)
-        high = max(c['reduction_range'][1] for c in cites)
+        low, high, _ = _category_stats(self.research_category)
         return (low, high)
 
 
+def _category_stats(category: str) -> Tuple[int, int, Fraction]:
+    """(low, high, median) reduction % for a research category, median exact."""
+    cols = _CITE_NUM.get(category)
+    if cols is None or not len(cols[0]):
+        return 15, 30, Fraction(20)
+    return (int(cols[1].min()), int(cols[2].max()),
+            Fraction(int(cols[0].sum()), len(cols[0])))
+
+
+@lru_cache(maxsize=64)
+def _reduction_plan(categories: Tuple[str, ...]) -> Tuple[Tuple, ...]:
+    """
+    Specialize the stacking math for one bundle shape (ordered research
+    categories). Returns per-slot (low, high, median_pct, reduction_factor,
+    remaining_share), where remaining_share is the fraction of incidents not
+    yet prevented by earlier slots. from_deficiencies only emits a handful
+    of shapes, so repeated hotspots reuse the same plan.
+
+    Factors and shares are exact Fractions so stacking accumulates no float
+    error and identical inputs always round to identical incident counts.
+    """
+    plan = []
+    cumulative = Fraction(1)  # Multiplicative stacking
+    for category in categories:
+        low, high, median = _category_stats(category)
+        reduction_factor = median / 100
+        plan.append((low, high, float(median), reduction_factor, cumulative))
+        cumulative *= (1 - reduction_factor)
+    return tuple(plan)
+
+
 class ROICalculator:
     """
     Calculates ROI for a set of CPTED interventions at a campus hotspot.
@@ -282,6 +331,9 @@ class ROICalculator:
         report = calc.calculate()
     """
 
+    __slots__ = ('annual_incidents', 'dominant_crime', 'location_name',
+                 'interventions', '_priority_counter')
+
     def __init__(self, annual_incidents: int,
                  dominant_crime: str = 'default',
                  location_name: str = 'Campus Location'):
@@ -380,42 +432,48 @@ class ROICalculator:
 
         # ── Per-intervention calculations ─────────────────────────────────────
         intervention_details = []
-        cumulative_reduction = 1.0  # Multiplicative stacking
-
-        for iv in self.interventions:
-            low, high  = iv.reduction_range
-            median_pct = iv.median_reduction_pct
+        plan = _reduction_plan(tuple(iv.research_category for iv in self.interventions))
+        total_infra_cost     = 0
+        total_annual_maint   = 0
+        total_citations      = 0
+
+        for iv, slot in zip(self.interventions, plan):
+            cd = iv.cost_data  # one INTERVENTION_COSTS probe per intervention
+            total_cost  = cd['unit_cost'] * iv.quantity
+            maintenance = cd.get('annual_maintenance', 200) * iv.quantity
+            total_infra_cost   += total_cost
+            total_annual_maint += maintenance
+
+            low, high, median_pct, reduction_factor, remaining = slot
             # Apply to remaining incidents (diminishing returns model)
-            reduction_factor   = median_pct / 100
             incidents_prevented = round(
-                self.annual_incidents * cumulative_reduction * reduction_factor
+                self.annual_incidents * remaining * reduction_factor
             )
             annual_savings = incidents_prevented * cost_per_incident
 
-            cumulative_reduction *= (1 - reduction_factor)
+            citations = iv.citations
+            total_citations += len(citations)
 
             intervention_details.append({
                 'priority':            iv.priority,
-                'name':                iv.cost_data['name'],
+                'name':                cd['name'],
                 'quantity':            iv.quantity,
                 'location_note':       iv.location_note,
-                'unit_cost':           iv.cost_data['unit_cost'],
-                'total_cost':          iv.total_cost,
-                'annual_maintenance':  iv.annual_maintenance_cost,
-                'cost_tier':           iv.cost_data.get('cost_tier', 'Medium'),
-                'lifespan_years':      iv.cost_data.get('lifespan_years', 10),
+                'unit_cost':           cd['unit_cost'],
+                'total_cost':          total_cost,
+                'annual_maintenance':  maintenance,
+                'cost_tier':           cd.get('cost_tier', 'Medium'),
+                'lifespan_years':      cd.get('lifespan_years', 10),
                 'reduction_pct_low':   low,
                 'reduction_pct_high':  high,
                 'reduction_pct_median': round(median_pct, 1),
                 'incidents_prevented': incidents_prevented,
                 'annual_savings':      annual_savings,
-                'citations':           iv.citations,
-                'citation_count':      len(iv.citations),
+                'citations':           citations,
+                'citation_count':      len(citations),
             })
 
         # ── Totals ────────────────────────────────────────────────────────────
-        total_infra_cost    = sum(iv.total_cost for iv in self.interventions)
-        total_annual_maint  = sum(iv.annual_maintenance_cost for iv in self.interventions)
         total_prevented     = sum(d['incidents_prevented'] for d in intervention_details)
         total_annual_savings = total_prevented * cost_per_incident
 
@@ -424,11 +482,13 @@ class ROICalculator:
         consultant_cost  = TRADITIONAL_CONSULTING_COST + total_infra_cost
         TigerTown_cost  = total_infra_cost + software_cost
 
-        roi_pct = ((total_annual_savings - total_infra_cost) /
-                   total_infra_cost * 100) if total_infra_cost > 0 else 0
+        # Guards are np.where/np.divide masks so the same math holds per-hotspot
+        roi_pct = float(_safe_div(total_annual_savings - total_infra_cost,
+                                  total_infra_cost, 0.0) * 100)
 
-        payback_days = ((total_infra_cost / total_annual_savings) * 365
-                        if total_annual_savings > 0 else 9999)
+        payback_days = float(np.where(total_annual_savings > 0,
+                                      _safe_div(total_infra_cost, total_annual_savings, 0.0) * 365,
+                                      9999))
 
         # ── Summary ───────────────────────────────────────────────────────────
         return {
@@ -440,7 +500,7 @@ class ROICalculator:
 
             'interventions': intervention_details,
             'intervention_count': len(intervention_details),
-            'total_citation_count': sum(d['citation_count'] for d in intervention_details),
+            'total_citation_count': total_citations,
 
             'financials': {
                 'total_infrastructure_cost': total_infra_cost,
@@ -489,42 +549,38 @@ class ROICalculator:
         r   = calc_result
         fin = r['financials']
         vc  = r['vs_consulting']
-        lines = [
-            f"\n{'─'*60}",
-            f"  ROI ANALYSIS — {r['location_name']}",
-            f"{'─'*60}",
-            f"  Annual Incidents:        {r['annual_incidents']}",
-            f"  Cost Per Incident:       ${r['cost_per_incident']:,}",
-            f"  Baseline Annual Cost:    ${r['baseline_annual_cost']:,}",
-            f"\n  RECOMMENDED INTERVENTIONS:",
-        ]
+        buf = io.StringIO()
+        w   = buf.write
+        w(f"\n{'─'*60}\n")
+        w(f"  ROI ANALYSIS — {r['location_name']}\n")
+        w(f"{'─'*60}\n")
+        w(f"  Annual Incidents:        {r['annual_incidents']}\n")
+        w(f"  Cost Per Incident:       ${r['cost_per_incident']:,}\n")
+        w(f"  Baseline Annual Cost:    ${r['baseline_annual_cost']:,}\n")
+        w(f"\n  RECOMMENDED INTERVENTIONS:\n")
         for iv in r['interventions']:
             low, high, med = iv['reduction_pct_low'], iv['reduction_pct_high'], iv['reduction_pct_median']
-            lines += [
-                f"\n  PRIORITY {iv['priority']}: {iv['name']}",
-                f"  Cost:     ${iv['total_cost']:,} ({iv['quantity']} × ${iv['unit_cost']:,})",
-                f"  Impact:   {low}-{high}% reduction (median {med}%)",
-                f"  Prevents: ~{iv['incidents_prevented']} incidents/year",
-                f"  Saves:    ${iv['annual_savings']:,}/year",
-                f"  Evidence: {iv['citation_count']} peer-reviewed studies",
-            ]
+            w(f"\n  PRIORITY {iv['priority']}: {iv['name']}\n")
+            w(f"  Cost:     ${iv['total_cost']:,} ({iv['quantity']} × ${iv['unit_cost']:,})\n")
+            w(f"  Impact:   {low}-{high}% reduction (median {med}%)\n")
+            w(f"  Prevents: ~{iv['incidents_prevented']} incidents/year\n")
+            w(f"  Saves:    ${iv['annual_savings']:,}/year\n")
+            w(f"  Evidence: {iv['citation_count']} peer-reviewed studies\n")
             for cite in iv['citations'][:2]:
-                lines.append(f"    • {cite['authors']} ({cite['year']}) — {cite['finding'][:80]}...")
-
-        lines += [
-            f"\n{'─'*60}",
-            f"  INVESTMENT SUMMARY",
-            f"{'─'*60}",
-            f"  Total Infrastructure:    ${fin['total_infrastructure_cost']:,}",
-            f"  Incidents Prevented/yr:  {fin['total_incidents_prevented']}",
-            f"  Annual Savings:          ${fin['total_annual_savings']:,}",
-            f"  ROI:                     {fin['roi_percentage']}% ({fin['roi_multiplier']}x return)",
-            f"  Payback Period:          {fin['payback_label']}",
-            f"  5-Year Net Savings:      ${fin['5yr_net_savings']:,}",
-            f"\n  vs. Traditional Consulting:",
-            f"  TigerTown approach:     ${vc['TigerTown_total']:,}",
-            f"  Traditional consultant:  ${vc['consultant_total']:,}",
-            f"  Your savings:            ${vc['savings_vs_consulting']:,} ({vc['savings_pct']}% cheaper)",
-            f"{'─'*60}\n",
-        ]
-        return '\n'.join(lines)
\ No newline at end of file
+                w(f"    • {cite['authors']} ({cite['year']}) — {cite['finding'][:80]}...\n")
+
+        w(f"\n{'─'*60}\n")
+        w(f"  INVESTMENT SUMMARY\n")
+        w(f"{'─'*60}\n")
+        w(f"  Total Infrastructure:    ${fin['total_infrastructure_cost']:,}\n")
+        w(f"  Incidents Prevented/yr:  {fin['total_incidents_prevented']}\n")
+        w(f"  Annual Savings:          ${fin['total_annual_savings']:,}\n")
+        w(f"  ROI:                     {fin['roi_percentage']}% ({fin['roi_multiplier']}x return)\n")
+        w(f"  Payback Period:          {fin['payback_label']}\n")
+        w(f"  5-Year Net Savings:      ${fin['5yr_net_savings']:,}\n")
+        w(f"\n  vs. Traditional Consulting:\n")
+        w(f"  TigerTown approach:     ${vc['TigerTown_total']:,}\n")
+        w(f"  Traditional consultant:  ${vc['consultant_total']:,}\n")
+        w(f"  Your savings:            ${vc['savings_vs_consulting']:,} ({vc['savings_pct']}% cheaper)\n")
+        w(f"{'─'*60}\n")
+        return buf.getvalue()
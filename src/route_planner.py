@@ -3,18 +3,31 @@ Route Planner - Feature 2: Step-level routing via OSRM
 Fetches real walking directions, scores each step individually,
 and attaches call box proximity + contextual safety notes.
 """
+import asyncio
+import copy
 import math
+import threading
+from collections import OrderedDict
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Dict, List, Optional, Tuple
 import sys
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent.parent))
 from src.risk_scorer import RiskScorer
+from src._compat import njit, json_loads as _json_loads
 
 # Public OSRM demo server (walking profile)
 OSRM_BASE = "http://router.project-osrm.org/route/v1/foot"
 
+# Max OSRM-backed routes kept in each planner's LRU route cache
+ROUTE_CACHE_SIZE = 256
+# Max (lat, lon, hour) risk details kept in each planner's risk cache
+RISK_CACHE_SIZE = 4096
+
 # MU Emergency Blue-Light Call Boxes (approximate locations)
 CALL_BOXES = [
     {"name": "Call Box - Memorial Union",     "lat": 38.9404, "lon": -92.3277},
@@ -30,25 +43,151 @@ CALL_BOXES = [
 ]
 
 
-def haversine(lat1, lon1, lat2, lon2) -> float:
-    R = 3959
+# Call-box coordinates in radians, precomputed once for batched lookups
+_BOX_LAT = np.radians(np.array([b['lat'] for b in CALL_BOXES], dtype=np.float64))
+_BOX_LON = np.radians(np.array([b['lon'] for b in CALL_BOXES], dtype=np.float64))
+_BOX_COS_LAT = np.cos(_BOX_LAT)
+# Same values as plain float lists for the scalar nearest_call_box loop
+_BOX_LAT_RAD = _BOX_LAT.tolist()
+_BOX_LON_RAD = _BOX_LON.tolist()
+_BOX_COS_LAT_RAD = _BOX_COS_LAT.tolist()
+
+# Coarse lat/lon grid over the boxes (0.01° ≈ 0.5-0.7 mi cells). Each box is
+# registered in its own cell and the 8 around it, so one cell probe returns
+# every box in the surrounding 3x3 block, in index order.
+_GRID_SCALE = 100
+_GRID: Dict[Tuple[int, int], List[int]] = {}
+for _i, _b in enumerate(CALL_BOXES):
+    _ci, _cj = math.floor(_b['lat'] * _GRID_SCALE), math.floor(_b['lon'] * _GRID_SCALE)
+    for _di in (-1, 0, 1):
+        for _dj in (-1, 0, 1):
+            _GRID.setdefault((_ci + _di, _cj + _dj), []).append(_i)
+del _i, _b, _ci, _cj, _di, _dj
+
+
+@njit(cache=True, fastmath=True)
+def _hav_a(lat1, lon1, lat2, lon2) -> float:
+    """Haversine term `a`; great-circle distance is monotone in it."""
     dlat = math.radians(lat2 - lat1)
     dlon = math.radians(lon2 - lon1)
-    a = (math.sin(dlat/2)**2 +
-         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2)
-    return R * 2 * math.asin(math.sqrt(a))
+    return (math.sin(dlat/2)**2 +
+            math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2)
+
+
+@njit(cache=True, fastmath=True)
+def _hav_a_rad(lat1_r, lon1_r, cos_lat1, lat2_r, lon2_r, cos_lat2) -> float:
+    """`a` from radian inputs with both cos(lat) terms precomputed."""
+    return (math.sin((lat2_r - lat1_r)/2)**2 +
+            cos_lat1 * cos_lat2 * math.sin((lon2_r - lon1_r)/2)**2)
+
+
+@njit(cache=True, fastmath=True)
+def _a_to_miles(a) -> float:
+    return 3959 * 2 * math.asin(math.sqrt(a))
+
+
+@njit(cache=True, fastmath=True)
+def haversine(lat1, lon1, lat2, lon2) -> float:
+    return _a_to_miles(_hav_a(lat1, lon1, lat2, lon2))
+
+
+def _call_box_hit(i: int, miles: float) -> Dict:
+    return {**CALL_BOXES[i], 'distance_miles': round(miles, 3),
+            'distance_ft': round(miles * 5280)}
+
+
+def _nearest_call_box_idx_batch(lats, lons) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (index into CALL_BOXES, distance in miles) of the nearest box for every
+    (lat, lon) pair. Builds the N x len(CALL_BOXES) haversine `a` matrix,
+    argmins each row, and converts only the winning `a` values to miles.
+    """
+    lats_rad = np.radians(np.asarray(lats, dtype=np.float64))
+    lons_rad = np.radians(np.asarray(lons, dtype=np.float64))
+    if lats_rad.size == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float64)
+    dlat = _BOX_LAT[None, :] - lats_rad[:, None]
+    dlon = _BOX_LON[None, :] - lons_rad[:, None]
+    a = (np.sin(dlat / 2) ** 2 +
+         np.cos(lats_rad)[:, None] * _BOX_COS_LAT[None, :] * np.sin(dlon / 2) ** 2)
+    idx = a.argmin(axis=1)
+    best_dist = 3959 * 2 * np.arcsin(np.sqrt(a[np.arange(len(idx)), idx]))
+    return idx, best_dist
+
+
+def nearest_call_box_batch(lats, lons) -> List[Dict]:
+    """Nearest call box dict for every (lat, lon) pair at once."""
+    idx, best_dist = _nearest_call_box_idx_batch(lats, lons)
+    return [_call_box_hit(i, d) for i, d in zip(idx.tolist(), best_dist.tolist())]
+
+
+def _grid_safe_miles(lat: float) -> float:
+    """Distance below which a grid-cell winner is guaranteed to be the true nearest."""
+    # Anything outside the 3x3 block is at least one full cell away in lat or lon
+    cell = math.radians(1 / _GRID_SCALE)
+    return 0.99 * 3959 * cell * math.cos(math.radians(abs(lat) + 2 / _GRID_SCALE))
+
+
+def _nearest_call_box_idx(lat: float, lon: float) -> Tuple[int, float]:
+    """(index into CALL_BOXES, distance in miles); (-1, inf) if there are no boxes."""
+    # Compare raw `a` values; sqrt/asin runs once, for the winner only
+    lat_r, lon_r = math.radians(lat), math.radians(lon)
+    cos_lat = math.cos(lat_r)
+
+    def scan(candidates):
+        best_i, best_a = -1, float('inf')
+        for i in candidates:
+            a = _hav_a_rad(lat_r, lon_r, cos_lat,
+                           _BOX_LAT_RAD[i], _BOX_LON_RAD[i], _BOX_COS_LAT_RAD[i])
+            if a < best_a:
+                best_i, best_a = i, a
+        return best_i, best_a
+
+    # Probe the query's grid cell first; fall back to a full scan when the
+    # cell is empty (off campus) or the winner could lie outside the block
+    cell = (math.floor(lat * _GRID_SCALE), math.floor(lon * _GRID_SCALE))
+    best_i, best_a = scan(_GRID.get(cell, ()))
+    if best_i < 0 or _a_to_miles(best_a) > _grid_safe_miles(lat):
+        best_i, best_a = scan(range(len(CALL_BOXES)))
+    if best_i < 0:
+        return -1, float('inf')
+    return best_i, _a_to_miles(best_a)
 
 
 def nearest_call_box(lat: float, lon: float) -> Optional[Dict]:
-    best = None
-    best_dist = float('inf')
-    for box in CALL_BOXES:
-        d = haversine(lat, lon, box['lat'], box['lon'])
-        if d < best_dist:
-            best_dist = d
-            best = {**box, 'distance_miles': round(d, 3),
-                    'distance_ft': round(d * 5280)}
-    return best
+    best_i, miles = _nearest_call_box_idx(lat, lon)
+    if best_i < 0:
+        return None
+    return _call_box_hit(best_i, miles)
+
+
+# OSRM turn modifiers → plain-English action
+_TURN_MAP = {
+    'left': 'Turn left', 'right': 'Turn right',
+    'slight left': 'Bear left', 'slight right': 'Bear right',
+    'sharp left': 'Sharp left', 'sharp right': 'Sharp right',
+    'straight': 'Continue straight', 'uturn': 'U-turn',
+}
+
+
+def _turn_direction(road: str, modifier: str) -> str:
+    action = _TURN_MAP.get(modifier, 'Continue')
+    return f"{action} onto {road}" if road else action
+
+
+def _default_direction(maneuver_type: str, road: str) -> str:
+    return f"Head toward {road}" if road else maneuver_type.replace('-', ' ').title()
+
+
+# maneuver type → handler(road, modifier); anything else uses _default_direction
+_MANEUVER_FNS = {
+    'depart':     lambda road, mod: f"Start on {road}",
+    'arrive':     lambda road, mod: "Arrive at destination",
+    'turn':       _turn_direction,
+    'new name':   _turn_direction,
+    'roundabout': lambda road, mod: f"Enter roundabout, take exit onto {road}",
+    'continue':   lambda road, mod: f"Continue on {road}",
+}
 
 
 class RoutePlanner:
@@ -59,6 +198,27 @@ class RoutePlanner:
 
     def __init__(self):
         self.risk_scorer = RiskScorer()
+        # Risk lookups memoized on ~10m cells (coords rounded to 4 dp) + hour;
+        # consecutive steps along one road often land in the same cell.
+        # (async routes score in worker threads, hence the lock)
+        self._risk_cache: OrderedDict = OrderedDict()
+        self._risk_lock = threading.Lock()
+        # Full OSRM routes keyed on quantized endpoints + hour (LRU order);
+        # api_server calls one planner from many request threads
+        self._route_cache: OrderedDict = OrderedDict()
+        self._route_lock = threading.Lock()
+        # Async path: shared httpx client + in-flight requests by route key
+        self._async_http = None
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        # Sync path: keep-alive session with a short retry budget for OSRM
+        self._http = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=8, pool_maxsize=16,
+            max_retries=Retry(total=2, backoff_factor=0.1,
+                              status_forcelist=(502, 503, 504)),
+        )
+        self._http.mount('http://', adapter)
+        self._http.mount('https://', adapter)
 
     def get_route(self, start_lat: float, start_lon: float,
                   end_lat: float, end_lon: float,
@@ -66,29 +226,150 @@ class RoutePlanner:
         """
         Fetch walking route and score each step.
         Returns enriched steps with risk detail per step.
+        Repeat queries for the same endpoints and hour are served from cache.
         """
-        osrm_url = (
-            f"{OSRM_BASE}/{start_lon},{start_lat};{end_lon},{end_lat}"
-            f"?steps=true&geometries=geojson&overview=full&annotations=true"
-        )
+        key = self._route_key(start_lat, start_lon, end_lat, end_lon, hour)
+        cached = self._cached_route(key)
+        if cached is not None:
+            return cached
 
         try:
-            resp = requests.get(osrm_url, timeout=5)
+            resp = self._http.get(self._osrm_url(start_lat, start_lon, end_lat, end_lon),
+                                  timeout=(1.0, 5.0))  # (connect, read)
             resp.raise_for_status()
-            data = resp.json()
+            data = _json_loads(resp.content)
         except Exception as e:
             print(f"⚠️  OSRM unavailable ({e}), using fallback straight-line route")
             return self._fallback_route(start_lat, start_lon, end_lat, end_lon, hour)
 
-        if data.get('code') != 'Ok' or not data.get('routes'):
+        result = self._score_route(data, hour)
+        if result is None:
             return self._fallback_route(start_lat, start_lon, end_lat, end_lon, hour)
+        self._store_route(key, result)
+        return result
+
+    async def get_route_async(self, start_lat: float, start_lon: float,
+                              end_lat: float, end_lon: float,
+                              hour: int) -> Dict:
+        """
+        Async variant of get_route for event-loop servers.
+        Uses one shared keep-alive httpx.AsyncClient, and concurrent calls for
+        the same endpoints + hour share a single in-flight OSRM request.
+        Step scoring runs in a worker thread so the loop is never blocked.
+        """
+        key = self._route_key(start_lat, start_lon, end_lat, end_lon, hour)
+        cached = self._cached_route(key)
+        if cached is not None:
+            return cached
+
+        pending = self._inflight.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._fetch_route_async(
+                key, start_lat, start_lon, end_lat, end_lon, hour))
+            self._inflight[key] = pending
+            pending.add_done_callback(lambda _f, k=key: self._inflight.pop(k, None))
+        return copy.deepcopy(await asyncio.shield(pending))
+
+    async def _fetch_route_async(self, key: Tuple, start_lat: float, start_lon: float,
+                                 end_lat: float, end_lon: float, hour: int) -> Dict:
+        import httpx
+        if self._async_http is None:
+            self._async_http = httpx.AsyncClient(timeout=5)
+
+        try:
+            resp = await self._async_http.get(
+                self._osrm_url(start_lat, start_lon, end_lat, end_lon))
+            resp.raise_for_status()
+            data = _json_loads(resp.content)
+        except Exception as e:
+            print(f"⚠️  OSRM unavailable ({e}), using fallback straight-line route")
+            return await asyncio.to_thread(
+                self._fallback_route, start_lat, start_lon, end_lat, end_lon, hour)
+
+        result = await asyncio.to_thread(self._score_route, data, hour)
+        if result is None:
+            return await asyncio.to_thread(
+                self._fallback_route, start_lat, start_lon, end_lat, end_lon, hour)
+        self._store_route(key, result)
+        return result
+
+    async def aclose(self):
+        """Close the shared async HTTP client, if one was opened."""
+        if self._async_http is not None:
+            await self._async_http.aclose()
+            self._async_http = None
+
+    # ── Route cache ───────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _route_key(start_lat, start_lon, end_lat, end_lon, hour) -> Tuple:
+        return (round(start_lat, 4), round(start_lon, 4),
+                round(end_lat, 4), round(end_lon, 4), hour)
+
+    def _cached_route(self, key: Tuple) -> Optional[Dict]:
+        with self._route_lock:
+            cached = self._route_cache.get(key)
+            if cached is None:
+                return None
+            self._route_cache.move_to_end(key)
+        # Stored entries are private copies that are never mutated in place
+        return copy.deepcopy(cached)
+
+    def _store_route(self, key: Tuple, result: Dict):
+        # Only OSRM results are cached so a fallback route gets retried next time
+        entry = copy.deepcopy(result)
+        with self._route_lock:
+            self._route_cache[key] = entry
+            self._route_cache.move_to_end(key)
+            while len(self._route_cache) > ROUTE_CACHE_SIZE:
+                self._route_cache.popitem(last=False)
+
+    def _risk_details(self, lats: List[float], lons: List[float], hour: int) -> List[Dict]:
+        """
+        Risk detail per point (fresh dict copies). Cache misses are scored in
+        one RiskScorer.get_risk_detail_batch call instead of one lookup each.
+        """
+        keys = [(round(lat, 4), round(lon, 4), hour) for lat, lon in zip(lats, lons)]
+        found: Dict[Tuple, Dict] = {}
+        with self._risk_lock:
+            for k in dict.fromkeys(keys):
+                cached = self._risk_cache.get(k)
+                if cached is not None:
+                    self._risk_cache.move_to_end(k)
+                    found[k] = cached
+        missing = [k for k in dict.fromkeys(keys) if k not in found]
+        if missing:
+            # Scored outside the lock so other request threads aren't blocked
+            details = self.risk_scorer.get_risk_detail_batch(
+                [k[0] for k in missing], [k[1] for k in missing], hour)
+            found.update(zip(missing, details))
+            with self._risk_lock:
+                for k, detail in zip(missing, details):
+                    self._risk_cache[k] = detail
+                    self._risk_cache.move_to_end(k)
+                while len(self._risk_cache) > RISK_CACHE_SIZE:
+                    self._risk_cache.popitem(last=False)
+        return [dict(found[k]) for k in keys]
+
+    # ── OSRM response → scored route ──────────────────────────────────────────
+
+    @staticmethod
+    def _osrm_url(start_lat, start_lon, end_lat, end_lon) -> str:
+        return (
+            f"{OSRM_BASE}/{start_lon},{start_lat};{end_lon},{end_lat}"
+            f"?steps=true&overview=false"  # only legs/steps are read; no geometry
+        )
+
+    def _score_route(self, data: Dict, hour: int) -> Optional[Dict]:
+        """Enrich an OSRM response with per-step risk; None if it has no route."""
+        if data.get('code') != 'Ok' or not data.get('routes'):
+            return None
 
         route = data['routes'][0]
         legs  = route.get('legs', [])
 
-        enriched_steps = []
-        step_number = 1
-
+        # Collect located steps first so call boxes are resolved in one batch
+        located = []
         for leg in legs:
             for step in leg.get('steps', []):
                 maneuver  = step.get('maneuver', {})
@@ -97,60 +378,42 @@ class RoutePlanner:
 
                 if step_lat is None or step_lon is None:
                     continue
+                located.append((step, maneuver, step_lat, step_lon))
+
+        # Only indices + distances here; call-box dicts are built per output step
+        box_idx, box_miles = _nearest_call_box_idx_batch([s[2] for s in located],
+                                                         [s[3] for s in located])
+
+        # All step risk lookups in one batch (copies, so callers can't mutate the cache)
+        risk_details = self._risk_details([s[2] for s in located],
+                                          [s[3] for s in located], hour)
 
-                instruction = step.get('name', '') or step.get('ref', '') or 'Unnamed road'
-                maneuver_type = maneuver.get('type', '')
-                modifier      = maneuver.get('modifier', '')
-                distance_m    = step.get('distance', 0)
-                duration_s    = step.get('duration', 0)
-
-                # Score this specific step location
-                risk_detail = self.risk_scorer.get_risk_detail(step_lat, step_lon, hour)
-
-                # Nearest call box at this step
-                call_box = nearest_call_box(step_lat, step_lon)
-
-                # Build human direction string
-                direction = self._build_direction(maneuver_type, modifier, instruction)
-
-                # Safety note for this step
-                safety_note = self._step_safety_note(risk_detail, call_box, distance_m)
-
-                enriched_steps.append({
-                    'step':        step_number,
-                    'direction':   direction,
-                    'road':        instruction,
-                    'lat':         step_lat,
-                    'lon':         step_lon,
-                    'distance_m':  round(distance_m),
-                    'duration_s':  round(duration_s),
-                    'risk_detail': risk_detail,
-                    'call_box':    call_box,
-                    'safety_note': safety_note,
-                })
-                step_number += 1
+        enriched_steps = [
+            self._enrich_step(n, step, detail, box_i, miles)
+            for n, (step, detail, box_i, miles) in enumerate(
+                zip(located, risk_details, box_idx.tolist(), box_miles.tolist()), 1)
+        ]
 
         total_distance_m = route.get('distance', 0)
         total_duration_s = route.get('duration', 0)
 
         # Overall route risk = weighted average of step scores
+        # (one array for max/argmax; the mean keeps the left-to-right float sum
+        # so rounding matches the per-step average exactly)
         if enriched_steps:
-            scores = [s['risk_detail']['risk_score'] for s in enriched_steps]
-            max_score = max(scores)
-            avg_score = round(sum(scores) / len(scores), 2)
+            scores = np.fromiter((s['risk_detail']['risk_score'] for s in enriched_steps),
+                                 dtype=np.float64, count=len(enriched_steps))
+            max_score = float(scores.max())
+            avg_score = round(sum(scores.tolist()) / len(scores), 2)
+            # Flag the highest-risk step (argmax keeps the first on ties, like max())
+            hotspot_step = enriched_steps[int(scores.argmax())]
         else:
             max_score, avg_score = 0, 0
+            hotspot_step = None
 
         overall_risk = ('High' if max_score >= 8 else
                         'Medium' if max_score >= 4 else 'Low')
 
-        # Flag the highest-risk step
-        if enriched_steps:
-            hotspot_step = max(enriched_steps,
-                               key=lambda s: s['risk_detail']['risk_score'])
-        else:
-            hotspot_step = None
-
         return {
             'source': 'osrm',
             'total_distance_m': round(total_distance_m),
@@ -165,35 +428,57 @@ class RoutePlanner:
             'hotspot_step': hotspot_step,
         }
 
+    def _enrich_step(self, step_number: int, located: Tuple, risk_detail: Dict,
+                     box_i: int, box_miles: float) -> Dict:
+        """Direction and safety note for one located, already-scored OSRM step."""
+        step, maneuver, step_lat, step_lon = located
+        instruction = step.get('name', '') or step.get('ref', '') or 'Unnamed road'
+        maneuver_type = maneuver.get('type', '')
+        modifier      = maneuver.get('modifier', '')
+        distance_m    = step.get('distance', 0)
+        duration_s    = step.get('duration', 0)
+
+        # Build human direction string
+        direction = self._build_direction(maneuver_type, modifier, instruction)
+
+        # Safety note for this step
+        safety_note = self._step_safety_note(risk_detail, box_i,
+                                             round(box_miles * 5280), distance_m)
+
+        return {
+            'step':        step_number,
+            'direction':   direction,
+            'road':        instruction,
+            'lat':         step_lat,
+            'lon':         step_lon,
+            'distance_m':  round(distance_m),
+            'duration_s':  round(duration_s),
+            'risk_detail': risk_detail,
+            'call_box':    _call_box_hit(box_i, box_miles),
+            'safety_note': safety_note,
+        }
+
     def _build_direction(self, maneuver_type: str, modifier: str, road: str) -> str:
         """Convert OSRM maneuver to plain English."""
-        if maneuver_type == 'depart':
-            return f"Start on {road}"
-        if maneuver_type == 'arrive':
-            return "Arrive at destination"
-        if maneuver_type in ('turn', 'new name'):
-            mod_map = {
-                'left': 'Turn left', 'right': 'Turn right',
-                'slight left': 'Bear left', 'slight right': 'Bear right',
-                'sharp left': 'Sharp left', 'sharp right': 'Sharp right',
-                'straight': 'Continue straight', 'uturn': 'U-turn',
-            }
-            action = mod_map.get(modifier, 'Continue')
-            return f"{action} onto {road}" if road else action
-        if maneuver_type == 'roundabout':
-            return f"Enter roundabout, take exit onto {road}"
-        if maneuver_type == 'continue':
-            return f"Continue on {road}"
-        return f"Head toward {road}" if road else maneuver_type.replace('-', ' ').title()
-
-    def _step_safety_note(self, risk_detail: Dict, call_box: Optional[Dict],
+        handler = _MANEUVER_FNS.get(maneuver_type)
+        if handler is None:
+            return _default_direction(maneuver_type, road)
+        return handler(road, modifier)
+
+    def _step_safety_note(self, risk_detail: Dict, box_i: int, box_ft: int,
                            distance_m: float) -> Optional[str]:
         """Generate a contextual safety note for a step."""
-        notes = []
-
         risk_level = risk_detail.get('risk_level', 'Low')
-        pattern    = risk_detail.get('pattern_summary', '')
         dominant   = risk_detail.get('dominant_crime')
+        call_near  = box_i >= 0 and box_ft <= 300
+
+        # Common case: low-risk step, no nearby call box, no crime-type note
+        if (risk_level == 'Low' and not call_near and dominant != 'assault'
+                and not (dominant == 'theft' and risk_detail.get('incident_count', 0) > 2)):
+            return None
+
+        notes = []
+        pattern     = risk_detail.get('pattern_summary', '')
         night_ratio = risk_detail.get('night_ratio', 0)
 
         if risk_level == 'High':
@@ -209,10 +494,10 @@ class RoutePlanner:
         if night_ratio >= 0.7 and risk_level != 'Low':
             notes.append("This area is notably more dangerous at night.")
 
-        if call_box and call_box['distance_ft'] <= 300:
+        if call_near:
             notes.append(
-                f"🔵 Emergency call box {call_box['distance_ft']}ft ahead "
-                f"({call_box['name']})."
+                f"🔵 Emergency call box {box_ft}ft ahead "
+                f"({CALL_BOXES[box_i]['name']})."
             )
 
         return " ".join(notes) if notes else None
@@ -26,7 +26,11 @@ MTFCC Road Classification Codes (relevant ones):
   S1830 - Bridle Path
 """
 
+import copy
 import math
+import threading
+import numpy as np
+from collections import OrderedDict
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 import sys
@@ -61,15 +65,34 @@ ROAD_CLASSIFICATIONS = {
 
 DEFAULT_ROAD = {'label': 'Unknown Road', 'surveillance': 4, 'width_ft': 20}
 
+# GeoParquet cache of the campus-area road subset, written on first load
+CAMPUS_ROADS_CACHE = "campus_roads.parquet"
 
-def _haversine(lat1, lon1, lat2, lon2) -> float:
-    R = 3959
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    a = (math.sin(dlat/2)**2 +
-         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
-         math.sin(dlon/2)**2)
-    return R * 2 * math.asin(math.sqrt(a))
+# Max entries in each per-loader query cache (keyed on ~10m coordinate cells)
+QUERY_CACHE_SIZE = 2048
+
+# Landmarks used by the no-data road estimate, as (lat_rad, lon_rad, cos_lat)
+# precomputed once — the tables are tiny, so a scalar loop beats array setup
+def _landmarks(points) -> Tuple[Tuple[float, float, float], ...]:
+    return tuple((math.radians(la), math.radians(lo), math.cos(math.radians(la)))
+                 for la, lo in points)
+
+
+_CORE = _landmarks([                     # Core campus — well-connected roads
+    (38.9404, -92.3277), (38.9441, -92.3269),
+    (38.9423, -92.3268), (38.9415, -92.3280),
+])
+_PARKING = _landmarks([(38.9450, -92.3240), (38.9380, -92.3350)])
+
+
+def _within(lat_r, lon_r, cos_lat, landmarks, miles) -> bool:
+    """True if the (radian) point is within `miles` of any precomputed landmark."""
+    for ref_lat, ref_lon, ref_cos in landmarks:
+        a = (math.sin((ref_lat - lat_r) / 2) ** 2 +
+             cos_lat * ref_cos * math.sin((ref_lon - lon_r) / 2) ** 2)
+        if 3959 * 2 * math.asin(math.sqrt(a)) < miles:
+            return True
+    return False
 
 
 class TIGERLoader:
@@ -85,34 +108,80 @@ class TIGERLoader:
         self.tiger_dir = tiger_dir
         self.roads_gdf = None
         self.campus_roads = None
+        self._sindex = None   # R-tree over campus_roads geometries
         self.has_real_data = False
+        # LRU memo of road / sightline queries; results only depend on the cell
+        # (api_server shares one loader across request threads, hence the lock)
+        self._roads_cache: OrderedDict = OrderedDict()
+        self._sightline_cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
         self._try_load()
 
+    def _cache_get(self, cache: OrderedDict, key: Tuple):
+        with self._cache_lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+
+    def _cache_put(self, cache: OrderedDict, key: Tuple, value):
+        with self._cache_lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > QUERY_CACHE_SIZE:
+                cache.popitem(last=False)
+
     def _try_load(self):
-        """Attempt to load the TIGER shapefile."""
+        """
+        Attempt to load the TIGER shapefile.
+        The campus-area subset is cached as GeoParquet next to the shapefile;
+        later starts read that single columnar file instead of SHP/DBF/SHX.
+        """
+        # Cached answers are tied to whatever data was loaded before
+        with self._cache_lock:
+            self._roads_cache.clear()
+            self._sightline_cache.clear()
         shp_files = list(self.tiger_dir.glob("*.shp")) if self.tiger_dir.exists() else []
+        cache_path = self.tiger_dir / CAMPUS_ROADS_CACHE
 
-        if not shp_files:
+        if not shp_files and not cache_path.exists():
             print("🗺️  TIGER: No shapefile found — using road type estimates")
             print(f"   Place tl_2025_29019_roads.shp in {self.tiger_dir}")
             return
 
         try:
             import geopandas as gpd
-            shp_path = shp_files[0]
-            print(f"🗺️  TIGER: Loading {shp_path.name}...")
-
-            gdf = gpd.read_file(str(shp_path))
-            print(f"   Total roads in Boone County: {len(gdf)}")
-
-            # Filter to MU campus area
-            bounds = CAMPUS_BOUNDS
-            campus = gdf.cx[
-                bounds['lon_min']:bounds['lon_max'],
-                bounds['lat_min']:bounds['lat_max']
-            ]
-            self.roads_gdf   = gdf
+
+            # Use the parquet cache unless the shapefile is newer than it
+            if cache_path.exists() and (
+                    not shp_files or
+                    cache_path.stat().st_mtime >= shp_files[0].stat().st_mtime):
+                print(f"🗺️  TIGER: Loading cached campus roads ({cache_path.name})...")
+                campus = gpd.read_parquet(cache_path)
+                self.roads_gdf = None  # county-wide frame is not cached
+            else:
+                shp_path = shp_files[0]
+                print(f"🗺️  TIGER: Loading {shp_path.name}...")
+
+                gdf = gpd.read_file(str(shp_path))
+                print(f"   Total roads in Boone County: {len(gdf)}")
+
+                # Filter to MU campus area, keeping only the columns we query
+                bounds = CAMPUS_BOUNDS
+                campus = gdf.cx[
+                    bounds['lon_min']:bounds['lon_max'],
+                    bounds['lat_min']:bounds['lat_max']
+                ][['MTFCC', 'FULLNAME', 'geometry']]
+                self.roads_gdf = gdf
+                try:
+                    campus.to_parquet(cache_path)
+                    print(f"   Cached campus roads to {cache_path.name}")
+                except Exception as e:
+                    print(f"   Could not cache campus roads ({e})")
+
             self.campus_roads = campus
+            # Build the spatial index now so queries don't pay for it lazily
+            self._sindex = campus.sindex
             self.has_real_data = True
             print(f"   Campus roads: {len(campus)} segments")
             print(f"   Road types: {campus['MTFCC'].value_counts().head(5).to_dict()}")
@@ -128,7 +197,18 @@ class TIGERLoader:
         """
         Get all road segments within radius_ft of a coordinate.
         Returns list of road dicts with name, type, classification, surveillance score.
+        Results are cached per ~10m cell (coordinates rounded to 4 decimals).
         """
+        key = (round(lat, 4), round(lon, 4), radius_ft)
+        roads = self._cache_get(self._roads_cache, key)
+        if roads is None:
+            roads = self._query_roads_near(lat, lon, radius_ft)
+            self._cache_put(self._roads_cache, key, roads)
+        return [dict(r) for r in roads]
+
+    def _query_roads_near(self, lat: float, lon: float,
+                          radius_ft: float) -> List[Dict]:
+        """Uncached road lookup behind get_roads_near."""
         if not self.has_real_data or self.campus_roads is None:
             return self._estimate_roads(lat, lon)
 
@@ -140,20 +220,25 @@ class TIGERLoader:
             point = Point(lon, lat)
             buffer = point.buffer(radius_deg)
 
-            nearby = self.campus_roads[self.campus_roads.intersects(buffer)]
-
-            roads = []
-            for _, row in nearby.iterrows():
-                mtfcc = str(row.get('MTFCC', ''))
-                cls   = ROAD_CLASSIFICATIONS.get(mtfcc, DEFAULT_ROAD)
-                roads.append({
-                    'name':        str(row.get('FULLNAME', 'Unnamed')),
-                    'mtfcc':       mtfcc,
-                    'type_label':  cls['label'],
-                    'surveillance_score': cls['surveillance'],
-                    'width_ft':    cls['width_ft'],
-                })
-            return roads
+            if self._sindex is not None:
+                # R-tree prunes to bbox candidates, then exact intersects test;
+                # sort positions to keep the original frame order
+                idx = np.sort(self._sindex.query(buffer, predicate='intersects'))
+                nearby = self.campus_roads.iloc[idx]
+            else:
+                nearby = self.campus_roads[self.campus_roads.intersects(buffer)]
+
+            # Read whole columns instead of iterrows() (no per-row Series boxing)
+            mtfccs  = nearby['MTFCC'].astype(str).tolist()
+            names   = nearby['FULLNAME'].fillna('Unnamed').astype(str).tolist()
+            classes = [ROAD_CLASSIFICATIONS.get(m, DEFAULT_ROAD) for m in mtfccs]
+            return [{
+                'name':        name,
+                'mtfcc':       mtfcc,
+                'type_label':  cls['label'],
+                'surveillance_score': cls['surveillance'],
+                'width_ft':    cls['width_ft'],
+            } for name, mtfcc, cls in zip(names, mtfccs, classes)]
 
         except Exception as e:
             return self._estimate_roads(lat, lon)
@@ -163,24 +248,20 @@ class TIGERLoader:
         Estimate road context from known MU campus geography.
         Used when TIGER data is unavailable.
         """
+        lat_r, lon_r = math.radians(lat), math.radians(lon)
+        cos_lat = math.cos(lat_r)
+
         # Core campus — well-connected secondary roads
-        core_locs = [
-            (38.9404, -92.3277), (38.9441, -92.3269),
-            (38.9423, -92.3268), (38.9415, -92.3280),
-        ]
-        for clat, clon in core_locs:
-            if _haversine(lat, lon, clat, clon) < 0.1:
-                return [{'name': 'Campus Road', 'mtfcc': 'S1400',
-                         'type_label': 'Local Road', 'surveillance_score': 7,
-                         'width_ft': 30}]
+        if _within(lat_r, lon_r, cos_lat, _CORE, 0.1):
+            return [{'name': 'Campus Road', 'mtfcc': 'S1400',
+                     'type_label': 'Local Road', 'surveillance_score': 7,
+                     'width_ft': 30}]
 
         # Parking areas
-        parking_locs = [(38.9450, -92.3240), (38.9380, -92.3350)]
-        for plat, plon in parking_locs:
-            if _haversine(lat, lon, plat, plon) < 0.08:
-                return [{'name': 'Parking Access', 'mtfcc': 'S1780',
-                         'type_label': 'Parking Lot Road', 'surveillance_score': 3,
-                         'width_ft': 20}]
+        if _within(lat_r, lon_r, cos_lat, _PARKING, 0.08):
+            return [{'name': 'Parking Access', 'mtfcc': 'S1780',
+                     'type_label': 'Parking Lot Road', 'surveillance_score': 3,
+                     'width_ft': 20}]
 
         # Perimeter / connectors
         return [{'name': 'Campus Path', 'mtfcc': 'S1710',
@@ -191,7 +272,17 @@ class TIGERLoader:
         """
         Full sightline analysis for a location.
         Returns natural surveillance score and contributing factors.
+        Results are cached per ~10m cell, like get_roads_near.
         """
+        key = (round(lat, 4), round(lon, 4))
+        analysis = self._cache_get(self._sightline_cache, key)
+        if analysis is None:
+            analysis = self._analyze_sightline(lat, lon)
+            self._cache_put(self._sightline_cache, key, analysis)
+        return copy.deepcopy(analysis)
+
+    def _analyze_sightline(self, lat: float, lon: float) -> Dict:
+        """Uncached analysis behind get_sightline_analysis."""
         roads = self.get_roads_near(lat, lon, radius_ft=300)
 
         if not roads:
@@ -13,20 +13,144 @@ Run this whenever:
   - You add the TIGER shapefile
 """
 
+import math
+import os
 import numpy as np
-import faiss
 import pickle
 import json
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import chain
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Tuple
 import sys
 
 sys.path.append(str(Path(__file__).parent.parent))
-from src.config import (FAISS_INDEX_PATH, METADATA_PATH,
-                         DOCSTORE_PATH, EMBEDDING_DIMENSION)
-from src.archia_client import ArchiaClient
-from src.document_processor import DocumentProcessor
-from src.data_summarizer import DataSummarizer
+from src.config import (FAISS_INDEX_PATH, METADATA_PATH, METADATA_ARROW_PATH,
+                         DOCSTORE_PATH, EMBEDDING_DIMENSION, FAISS_USE_GPU)
+from src._compat import json_loads as _json_loads, jsonl_line as _jsonl_line
+
+
+
+@lru_cache(maxsize=None)
+def get_faiss():
+    """
+    Import FAISS on first use, so the CLI (--help, arg errors) and importers
+    that never touch the index don't pay for it. FAISS only parallelizes
+    add/search over the OpenMP threads it is told about, so set that once here.
+    """
+    import faiss
+    faiss.omp_set_num_threads(os.cpu_count() or 1)
+    return faiss
+
+# IVF+PQ needs enough vectors to train its codebooks (FAISS wants ~39 per
+# coarse cell, i.e. N >= 39·4√N); below this the exact flat index is used.
+IVF_MIN_VECTORS = 25_000
+IVF_NPROBE      = 16   # inverted lists probed per query
+PQ_SUBQUANTIZERS = 32  # 384 dims → 32 sub-vectors of 12 dims, 8 bits each
+
+# Texts handed to the embedding client per call when building the matrix
+EMBED_SLICE_SIZE = 1000
+# Corpus size above which worker-process embedding beats its model-load cost
+PARALLEL_EMBED_MIN = 20_000
+
+
+class ChunkTable:
+    """
+    Read-only, list-like view over chunk metadata stored as an Arrow IPC file.
+    The file is memory-mapped, so only the rows FAISS hits are paged in and
+    turned back into dicts. Common string fields get their own column; any
+    other keys ride along as one JSON string per row.
+    """
+
+    COLUMNS = ('chunk_id', 'source', 'type', 'text')
+
+    def __init__(self, table):
+        self.table = table
+        self._cols = {name: table.column(name) for name in table.column_names}
+
+    @classmethod
+    def from_chunks(cls, chunks: List[Dict]) -> 'ChunkTable':
+        import pyarrow as pa
+        columns = {name: [] for name in cls.COLUMNS}
+        extras = []
+        for chunk in chunks:
+            rest = dict(chunk)
+            for name in cls.COLUMNS:
+                value = rest.get(name)
+                # Only plain strings get a column; null there means "key absent"
+                if isinstance(value, str):
+                    columns[name].append(rest.pop(name))
+                else:
+                    columns[name].append(None)
+            extras.append(json.dumps(rest) if rest else None)
+        arrays = {name: pa.array(vals, type=pa.string()) for name, vals in columns.items()}
+        arrays['extra'] = pa.array(extras, type=pa.string())
+        return cls(pa.table(arrays))
+
+    def write(self, path: Path):
+        import pyarrow as pa
+        with pa.OSFile(str(path), 'wb') as sink:
+            with pa.ipc.new_file(sink, self.table.schema) as writer:
+                writer.write_table(self.table)
+
+    @classmethod
+    def open(cls, path: Path) -> 'ChunkTable':
+        import pyarrow as pa
+        return cls(pa.ipc.open_file(pa.memory_map(str(path), 'r')).read_all())
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    def __getitem__(self, i) -> Dict:
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        chunk = {}
+        for name in self.COLUMNS:
+            value = self._cols[name][i].as_py()
+            if value is not None:
+                chunk[name] = value
+        extra = self._cols['extra'][i].as_py()
+        if extra:
+            chunk.update(json.loads(extra))
+        return chunk
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def _chunk_key(chunk: Dict) -> str:
+    """Identity used for dedup and incremental updates."""
+    return chunk.get('chunk_id', chunk.get('id', ''))
+
+
+def _partition_docstore(data_only: bool = False) -> Tuple[List[Dict], List[Dict]]:
+    """
+    One buffered pass over DOCSTORE_PATH, split into
+    (document chunks, data summary chunks). Unparseable lines are skipped.
+    With data_only, document chunks are not returned and lines that cannot
+    be data summaries (no "data_summary" bytes at all) are never parsed.
+    """
+    doc_chunks, data_chunks = [], []
+    with open(DOCSTORE_PATH, 'rb', buffering=1 << 20) as f:
+        for line in f:
+            if data_only and b'data_summary' not in line:
+                continue
+            try:
+                chunk = _json_loads(line)
+                is_data = chunk.get('type') == 'data_summary'
+            except Exception:
+                continue
+            if is_data:
+                data_chunks.append(chunk)
+            elif not data_only:
+                doc_chunks.append(chunk)
+    return doc_chunks, data_chunks
 
 
 class VectorIndexBuilder:
@@ -36,11 +160,19 @@ class VectorIndexBuilder:
     """
 
     def __init__(self):
+        # Heavy deps (sentence-transformers, PDF parsing) load with the builder
+        from src.archia_client import ArchiaClient
+        from src.document_processor import DocumentProcessor
+        from src.data_summarizer import DataSummarizer
         self.client        = ArchiaClient()
         self.doc_processor = DocumentProcessor()
         self.summarizer    = DataSummarizer()
         self.chunks: List[Dict] = []
         self.index = None
+        self._gpu_res = None  # set while self.index lives on a GPU
+        # Chunk-type / data-source tallies for print_index_stats (None = stale)
+        self._type_counts: Counter = None
+        self._source_counts: Counter = None
 
     # ── Chunk loading ─────────────────────────────────────────────────────────
 
@@ -61,16 +193,8 @@ class VectorIndexBuilder:
         """
         if not force_rebuild and DOCSTORE_PATH.exists():
             # Check if data chunks already exist in docstore
-            existing_data_chunks = []
             try:
-                with open(DOCSTORE_PATH, 'r') as f:
-                    for line in f:
-                        try:
-                            chunk = json.loads(line)
-                            if chunk.get('type') == 'data_summary':
-                                existing_data_chunks.append(chunk)
-                        except Exception:
-                            continue
+                _, existing_data_chunks = _partition_docstore(data_only=True)
                 if existing_data_chunks:
                     print(f"  Loaded {len(existing_data_chunks)} existing data summary chunks")
                     return existing_data_chunks
@@ -97,18 +221,17 @@ class VectorIndexBuilder:
         print("\n  Loading data summary chunks (CSV/TIGER/VIIRS)...")
         data_chunks = self.load_data_chunks(force_rebuild=force_rebuild)
 
-        all_chunks = doc_chunks + data_chunks
-
-        # Deduplicate by chunk_id
-        seen = set()
-        deduped = []
-        for chunk in all_chunks:
-            cid = chunk.get('chunk_id', chunk.get('id', ''))
-            if cid not in seen:
-                seen.add(cid)
-                deduped.append(chunk)
-
-        dupes = len(all_chunks) - len(deduped)
+        # Deduplicate by chunk_id (first wins; dicts keep insertion order)
+        # and tally types/sources for print_index_stats in the same pass
+        by_id = {}
+        self._type_counts, self._source_counts = Counter(), Counter()
+        keep, tally = by_id.setdefault, self._tally  # bound once, not per chunk
+        for chunk in chain(doc_chunks, data_chunks):
+            if keep(_chunk_key(chunk), chunk) is chunk:
+                tally(chunk)
+        deduped = list(by_id.values())
+
+        dupes = len(doc_chunks) + len(data_chunks) - len(deduped)
         if dupes:
             print(f"  Removed {dupes} duplicate chunks")
 
@@ -122,69 +245,192 @@ class VectorIndexBuilder:
 
     def create_embeddings(self, chunks: List[Dict]) -> np.ndarray:
         """Create embeddings for all chunks using local sentence-transformers."""
+        faiss = get_faiss()
         print(f"\n  Creating embeddings for {len(chunks)} chunks...")
-        texts = [chunk['text'] for chunk in chunks]
-        embeddings = self.client.create_embeddings_batch(texts)
-        arr = np.array(embeddings, dtype='float32')
+        n = len(chunks)
+        # Embed longest-first so each model batch pads to similar lengths,
+        # then scatter rows back to chunk order in one preallocated matrix.
+        # Texts are read from the chunks per slice; no corpus-wide text list.
+        order = np.argsort(np.fromiter((-len(c['text']) for c in chunks),
+                                       dtype=np.int64, count=n), kind='stable')
+        arr = np.empty((n, EMBEDDING_DIMENSION), dtype=np.float32)
+        if n >= PARALLEL_EMBED_MIN:
+            # Full-corpus rebuilds: shard across GPUs / CPU worker processes
+            arr[order] = self.client.create_embeddings_parallel(
+                [chunks[i]['text'] for i in order])
+        else:
+            self._embed_slices(chunks, order, arr)
+        # The encoder already normalizes; this re-normalizes away fp16 rounding
+        # so inner product == cosine similarity
+        faiss.normalize_L2(arr)
         print(f"  Embeddings shape: {arr.shape}")
         return arr
 
+    def _embed_slices(self, chunks: List[Dict], order: np.ndarray, arr: np.ndarray):
+        """Embed chunk texts in `order`, EMBED_SLICE_SIZE at a time, into rows of arr."""
+        for start in range(0, len(chunks), EMBED_SLICE_SIZE):
+            rows = order[start:start + EMBED_SLICE_SIZE]
+            # fp16 halves the device→host copy; rows are upcast on assignment
+            arr[rows] = self.client.create_embeddings_batch(
+                [chunks[i]['text'] for i in rows], fp16=True)
+
     # ── Index building ────────────────────────────────────────────────────────
 
-    def build_index(self, embeddings: np.ndarray) -> faiss.Index:
-        """Build FAISS flat L2 index from embeddings."""
+    def build_index(self, embeddings: np.ndarray, use_gpu: bool = None) -> 'faiss.Index':
+        """
+        Build FAISS index from embeddings.
+        Embeddings are unit-normalized, so both use the inner-product metric
+        (cosine similarity). Small corpora get an exhaustive index storing
+        FP16 scalar-quantized vectors (half the memory of FP32, negligible
+        recall loss); large ones an IVF+PQ index (nlist ≈ 4·√N coarse cells,
+        product-quantized codes) trained on the embeddings themselves.
+        With use_gpu (default: FAISS_USE_GPU) and a visible GPU, vectors are
+        added to a GPU copy so rebuild-time batch searches run there;
+        save_index copies it back to the CPU for serialization.
+        """
+        faiss = get_faiss()
         print("\n  Building FAISS index...")
-        index = faiss.IndexFlatL2(EMBEDDING_DIMENSION)
+        # e.g. "OPTIMIZE DD AVX2 AVX512" when the SIMD-dispatch wheel is in use
+        print(f"  FAISS SIMD: {faiss.get_compile_options().strip()} · "
+              f"{faiss.omp_get_max_threads()} threads")
+        self._gpu_res = None
+        n = len(embeddings)
+        if n < IVF_MIN_VECTORS:
+            index = faiss.index_factory(EMBEDDING_DIMENSION, "SQfp16",
+                                        faiss.METRIC_INNER_PRODUCT)
+            index.train(embeddings)  # no-op for fp16, kept for the API contract
+        else:
+            nlist = max(4, int(4 * math.sqrt(n)))
+            factory = f"IVF{nlist},PQ{PQ_SUBQUANTIZERS}x8"
+            print(f"  Training {factory} on {n} vectors...")
+            index = faiss.index_factory(EMBEDDING_DIMENSION, factory,
+                                        faiss.METRIC_INNER_PRODUCT)
+            index.train(embeddings)
+            self._set_nprobe(index)
+        if FAISS_USE_GPU if use_gpu is None else use_gpu:
+            index = self._to_gpu(index)
         index.add(embeddings)
         print(f"  Index built: {index.ntotal} vectors, dimension {index.d}")
         self.index = index
         return index
 
+    def _to_gpu(self, index: 'faiss.Index') -> 'faiss.Index':
+        """Move an (empty, trained) index to GPU 0; returns it unchanged if that fails."""
+        faiss = get_faiss()
+        if getattr(faiss, 'get_num_gpus', lambda: 0)() == 0:
+            print("  No GPU visible to FAISS — building on CPU")
+            return index
+        try:
+            res = faiss.StandardGpuResources()
+            gpu_index = faiss.index_cpu_to_gpu(res, 0, index)
+        except RuntimeError as e:  # e.g. index type without a GPU implementation
+            print(f"  GPU index unavailable ({e}), building on CPU")
+            return index
+        self._gpu_res = res
+        print("  Building on GPU 0")
+        return gpu_index
+
+    @staticmethod
+    def _set_nprobe(index: 'faiss.Index'):
+        """Apply IVF_NPROBE to IVF indexes (no-op for flat ones)."""
+        faiss = get_faiss()
+        if faiss.try_extract_index_ivf(index) is not None:
+            faiss.ParameterSpace().set_index_parameter(index, 'nprobe', IVF_NPROBE)
+
     def save_index(self):
-        """Save FAISS index and chunk metadata."""
+        """
+        Save FAISS index and chunk metadata. Metadata goes to a memory-mappable
+        Arrow file when pyarrow is available, otherwise to the pickle.
+        """
+        faiss = get_faiss()
         FAISS_INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
-        faiss.write_index(self.index, str(FAISS_INDEX_PATH))
+        cpu_index = (faiss.index_gpu_to_cpu(self.index)
+                     if self._gpu_res is not None else self.index)
+        faiss.write_index(cpu_index, str(FAISS_INDEX_PATH))
         print(f"  Saved index:    {FAISS_INDEX_PATH}")
-        with open(METADATA_PATH, 'wb') as f:
-            pickle.dump(self.chunks, f)
-        print(f"  Saved metadata: {METADATA_PATH} ({len(self.chunks)} chunks)")
+        try:
+            table = (self.chunks if isinstance(self.chunks, ChunkTable)
+                     else ChunkTable.from_chunks(self.chunks))
+            table.write(METADATA_ARROW_PATH)
+            # Drop any stale pickle so load_index can't pick up old metadata
+            METADATA_PATH.unlink(missing_ok=True)
+            print(f"  Saved metadata: {METADATA_ARROW_PATH} ({len(self.chunks)} chunks)")
+        except ImportError:
+            with open(METADATA_PATH, 'wb') as f:
+                # Protocol 5 (PEP 574): faster framing for dict-heavy payloads
+                pickle.dump(list(self.chunks), f, protocol=5)
+            METADATA_ARROW_PATH.unlink(missing_ok=True)
+            print(f"  Saved metadata: {METADATA_PATH} ({len(self.chunks)} chunks)")
 
     def load_index(self):
-        """Load existing FAISS index and metadata."""
-        if not FAISS_INDEX_PATH.exists() or not METADATA_PATH.exists():
+        """
+        Load existing FAISS index and metadata (Arrow table, else pickle).
+        The index file is read on a worker thread (FAISS releases the GIL)
+        while the metadata loads, so the two reads overlap.
+        """
+        faiss = get_faiss()
+        if not FAISS_INDEX_PATH.exists():
             return None, None
-        index = faiss.read_index(str(FAISS_INDEX_PATH))
-        with open(METADATA_PATH, 'rb') as f:
-            chunks = pickle.load(f)
+        if not METADATA_ARROW_PATH.exists() and not METADATA_PATH.exists():
+            return None, None
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pending = pool.submit(faiss.read_index, str(FAISS_INDEX_PATH))
+            chunks = self._load_metadata()
+            index = pending.result()
+        if chunks is None:
+            return None, None
+        self._set_nprobe(index)
         print(f"  Loaded index:    {index.ntotal} vectors")
         print(f"  Loaded metadata: {len(chunks)} chunks")
         self.index  = index
         self.chunks = chunks
+        self._gpu_res = None
+        self._type_counts = self._source_counts = None
         return index, chunks
 
+    @staticmethod
+    def _load_metadata():
+        """Chunk metadata from the Arrow table, else the pickle; None if neither loads."""
+        if METADATA_ARROW_PATH.exists():
+            try:
+                return ChunkTable.open(METADATA_ARROW_PATH)
+            except ImportError:
+                pass
+        if not METADATA_PATH.exists():
+            return None
+        with open(METADATA_PATH, 'rb') as f:
+            return pickle.load(f)
+
     # ── Stats ─────────────────────────────────────────────────────────────────
 
+    def _tally(self, chunk: Dict):
+        ctype = chunk.get('type')
+        self._type_counts[ctype] += 1
+        if ctype == 'data_summary':
+            # Source breakdown for data chunks (prefix before the first '_')
+            self._source_counts[chunk.get('source', 'unknown').split('_', 1)[0]] += 1
+
     def print_index_stats(self):
         """Print breakdown of what's in the index."""
         if not self.chunks:
             return
-        doc_chunks  = [c for c in self.chunks if c.get('type') != 'data_summary']
-        data_chunks = [c for c in self.chunks if c.get('type') == 'data_summary']
-
-        # Source breakdown for data chunks
-        sources = {}
-        for c in data_chunks:
-            src = c.get('source', 'unknown')
-            key = src.split('_')[0] if '_' in src else src
-            sources[key] = sources.get(key, 0) + 1
-
-        print(f"\n  Index contents:")
-        print(f"    Policy document chunks: {len(doc_chunks)}")
-        print(f"    Data summary chunks:    {len(data_chunks)}")
-        if sources:
-            for src, cnt in sorted(sources.items()):
-                print(f"      {src}: {cnt} chunks")
-        print(f"    Total vectors: {self.index.ntotal if self.index else 'N/A'}")
+        if self._type_counts is None:
+            # Loaded/updated index: tally once, then reuse
+            self._type_counts, self._source_counts = Counter(), Counter()
+            for chunk in self.chunks:
+                self._tally(chunk)
+        n_data = self._type_counts['data_summary']
+        n_docs = sum(self._type_counts.values()) - n_data
+
+        lines = [
+            "\n  Index contents:",
+            f"    Policy document chunks: {n_docs}",
+            f"    Data summary chunks:    {n_data}",
+        ]
+        lines += [f"      {src}: {cnt} chunks"
+                  for src, cnt in sorted(self._source_counts.items())]
+        lines.append(f"    Total vectors: {self.index.ntotal if self.index else 'N/A'}")
+        print("\n".join(lines))
 
     # ── Main build pipeline ───────────────────────────────────────────────────
 
@@ -225,6 +471,38 @@ class VectorIndexBuilder:
         return index, chunks
 
 
+    def update(self):
+        """
+        Incremental build: embed and append only chunks whose id is not in
+        the saved index yet, instead of re-embedding the whole corpus.
+        Falls back to a full build when no index exists.
+        """
+        index, chunks = self.load_index()
+        if index is None:
+            print("\n  No existing index — running full build")
+            return self.build()
+
+        indexed = list(chunks)
+        existing = {_chunk_key(c) for c in indexed}
+        new_chunks = [c for c in self.load_all_chunks()
+                      if _chunk_key(c) not in existing]
+        if not new_chunks:
+            print("\n  Index is up to date — nothing new to embed")
+            self.chunks = indexed
+            self._type_counts = self._source_counts = None
+            return index, indexed
+
+        print(f"\n  Adding {len(new_chunks)} new chunks to existing index...")
+        embeddings = self.create_embeddings(new_chunks)
+        index.add(embeddings)
+        self.index  = index
+        self.chunks = indexed + new_chunks
+        self._type_counts = self._source_counts = None
+        self.save_index()
+        self.print_index_stats()
+        return self.index, self.chunks
+
+
 def main():
     import argparse
     parser = argparse.ArgumentParser(description='TigerTown FAISS Index Builder')
@@ -232,6 +510,8 @@ def main():
                         help='Force rebuild even if index exists')
     parser.add_argument('--data-only', action='store_true',
                         help='Only regenerate data summary chunks, then rebuild')
+    parser.add_argument('--update', action='store_true',
+                        help='Embed and add only chunks missing from the existing index')
     args = parser.parse_args()
 
     builder = VectorIndexBuilder()
@@ -240,22 +520,16 @@ def main():
         print("\n  Regenerating data summary chunks only...")
         # Clear existing data chunks from docstore
         if DOCSTORE_PATH.exists():
-            non_data = []
-            with open(DOCSTORE_PATH, 'r') as f:
-                for line in f:
-                    try:
-                        chunk = json.loads(line)
-                        if chunk.get('type') != 'data_summary':
-                            non_data.append(chunk)
-                    except Exception:
-                        continue
-            with open(DOCSTORE_PATH, 'w') as f:
-                for chunk in non_data:
-                    f.write(json.dumps(chunk) + '\n')
+            non_data, _ = _partition_docstore()
+            with open(DOCSTORE_PATH, 'wb') as f:
+                f.writelines(_jsonl_line(chunk) for chunk in non_data)
             print(f"  Cleared data chunks from docstore, kept {len(non_data)} doc chunks")
         args.force = True
 
-    index, chunks = builder.build(force_rebuild=args.force)
+    if args.update and not args.force:
+        index, chunks = builder.update()
+    else:
+        index, chunks = builder.build(force_rebuild=args.force)
 
     if index:
         print(f"\n  Final index stats:")
@@ -29,13 +29,23 @@ LUMINANCE THRESHOLDS (nW/cm²/sr):
 """
 
 import math
+import os
 import struct
+import threading
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import chain
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 import sys
 
+import numpy as np
+
 sys.path.append(str(Path(__file__).parent.parent))
 from src.config import DATA_DIR
+from src._compat import HAS_NUMBA, njit
 
 VIIRS_DIR = DATA_DIR / "viirs"
 
@@ -45,10 +55,27 @@ THRESHOLD_DIM       = 2.0    # Below safe pedestrian standard
 THRESHOLD_ADEQUATE  = 5.0    # Meets campus minimum
 THRESHOLD_WELL_LIT  = 10.0   # Above standard
 
+# Campus area of interest (left, bottom, right, top) — read into memory once
+# at load time; at ~463 m/pixel this is only a handful of VIIRS pixels
+CAMPUS_AOI = (-92.35, 38.92, -92.31, 38.96)
+
+# Per-loader LRU size for sampled luminance. Raster lookups are keyed on the
+# (row, col) pixel index, so every point inside one pixel shares an entry;
+# estimates are keyed on exact coordinates
+SAMPLE_CACHE_SIZE = 4096
+
+# Coarsest pixel (metres) still fine enough for campus-scale sampling; GeoTIFF
+# overviews up to this size are read instead of full resolution
+OVERVIEW_MAX_PIXEL_M = 100
+
+# GDAL-backend batches fan out over a thread pool once every worker gets at
+# least this many points; each worker thread keeps its own dataset handle
+PARALLEL_BATCH_MIN = 64
+
 # Estimated luminance for known MU campus locations
 # Based on Google Earth nighttime imagery + street infrastructure knowledge
 # Used as fallback when no VIIRS raster is available
-CAMPUS_LUMINANCE_ESTIMATES = {
+CAMPUS_LUMINANCE_ESTIMATES = np.array([
     # (lat_center, lon_center, radius_miles, luminance_nw)
     # Core campus — well lit
     (38.9404, -92.3277, 0.05, 6.2),   # Memorial Union
@@ -73,40 +100,159 @@ CAMPUS_LUMINANCE_ESTIMATES = {
     (38.9465, -92.3270, 0.05, 2.3),   # North Campus
     (38.9420, -92.3220, 0.06, 1.6),   # East Entrance
     (38.9410, -92.3340, 0.06, 0.8),   # West Connector — dark
-}
-
-
-def _haversine(lat1, lon1, lat2, lon2) -> float:
-    R = 3959
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    a = (math.sin(dlat/2)**2 +
-         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
-         math.sin(dlon/2)**2)
-    return R * 2 * math.asin(math.sqrt(a))
+], dtype=[('lat', 'f8'), ('lon', 'f8'), ('radius', 'f8'), ('lum', 'f8')])
+
+# Contiguous per-field columns for the estimate kernel (struct-of-arrays)
+_REF_LAT, _REF_LON, _REF_RADIUS, _REF_LUM = (
+    np.ascontiguousarray(CAMPUS_LUMINANCE_ESTIMATES[field])
+    for field in ('lat', 'lon', 'radius', 'lum')
+)
+_REF_LAT_RAD = np.radians(_REF_LAT)
+_REF_LON_RAD = np.radians(_REF_LON)
+_REF_COS_LAT = np.cos(_REF_LAT_RAD)
+
+
+@njit(cache=True, fastmath=True)
+def _estimate_kernel(lat, lon, ref_lat_r, ref_lon_r, ref_cos, ref_r, ref_v) -> float:
+    """Inverse-distance-weighted luminance over references within 2x their radius."""
+    sw = 0.0
+    swv = 0.0
+    lat_r = math.radians(lat)
+    lon_r = math.radians(lon)
+    cos_lat = math.cos(lat_r)
+    for i in range(ref_lat_r.shape[0]):
+        a = (math.sin((ref_lat_r[i] - lat_r)/2)**2 +
+             cos_lat * ref_cos[i] * math.sin((ref_lon_r[i] - lon_r)/2)**2)
+        dist = 3959 * 2 * math.asin(math.sqrt(a))
+        if dist <= ref_r[i] * 2:
+            w = max(0.01, 1.0 / (dist + 0.001))
+            sw += w
+            swv += w * ref_v[i]
+    if sw == 0.0:
+        return -1.0
+    return swv / sw
+
+
+def _estimate_vec(lat, lon, ref_lat_r, ref_lon_r, ref_cos, ref_r, ref_v) -> float:
+    """NumPy form of _estimate_kernel for installs without numba."""
+    lat_r = math.radians(lat)
+    a = (np.sin((ref_lat_r - lat_r)/2)**2 +
+         math.cos(lat_r) * ref_cos * np.sin((ref_lon_r - math.radians(lon))/2)**2)
+    dist = 3959 * 2 * np.arcsin(np.sqrt(a))
+    w = np.where(dist <= ref_r * 2, np.maximum(0.01, 1.0 / (dist + 0.001)), 0.0)
+    sw = w.sum()
+    if sw == 0.0:
+        return -1.0
+    return float((w * ref_v).sum() / sw)
+
+
+_estimate = _estimate_kernel if HAS_NUMBA else _estimate_vec  # no numba → NumPy path
+
+
+def _estimate_batch(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """
+    Campus estimates for R points at once: one (R, N) haversine matrix against
+    the reference table, IDW per row, 1.5 where no reference is in reach.
+    """
+    lat_r = np.radians(lats)[:, None]
+    lon_r = np.radians(lons)[:, None]
+    a = (np.sin((_REF_LAT_RAD - lat_r)/2)**2 +
+         np.cos(lat_r) * _REF_COS_LAT * np.sin((_REF_LON_RAD - lon_r)/2)**2)
+    dist = 3959 * 2 * np.arcsin(np.sqrt(a))
+    w = np.where(dist <= _REF_RADIUS * 2, np.maximum(0.01, 1.0 / (dist + 0.001)), 0.0)
+    sw = w.sum(axis=1)
+    swv = w @ _REF_LUM
+    out = np.full(len(lats), 1.5)
+    hit = sw > 0
+    out[hit] = np.round(swv[hit] / sw[hit], 2)
+    return out
+
+
+# Band edges for label/risk lookup; bisect_right keeps the "< threshold" bounds
+_THRESHOLDS = (THRESHOLD_CRITICAL, THRESHOLD_DIM, THRESHOLD_ADEQUATE, THRESHOLD_WELL_LIT)
+_LABELS     = ("Very Dark", "Dim", "Adequate", "Well-Lit", "Bright")
+_RISKS      = ("High", "Medium", "Low", "Low", "Low")
+
+
+# get_lighting_summary tiers: critical / inadequate / marginal / adequate.
+# Thresholds are baked in at import; only lum, source and deficit vary.
+_SUMMARY_THRESHOLDS = (THRESHOLD_CRITICAL, THRESHOLD_DIM, THRESHOLD_ADEQUATE)
+_SUMMARY_TMPL = (
+    ("Critically dark — {lum:.2f} nW/cm²/sr {src}. "
+     f"Well below the {THRESHOLD_DIM} nW/cm²/sr safe pedestrian threshold. "
+     "Immediate lighting intervention required."),
+    ("Inadequate lighting — {lum:.2f} nW/cm²/sr {src}. "
+     f"{{deficit}}% below the {THRESHOLD_DIM} nW/cm²/sr safe minimum. "
+     "Lighting improvement recommended."),
+    ("Marginal lighting — {lum:.2f} nW/cm²/sr {src}. "
+     f"Meets minimum standard but below the {THRESHOLD_ADEQUATE} nW/cm²/sr "
+     "recommended campus level."),
+    ("Adequate lighting — {lum:.2f} nW/cm²/sr {src}. "
+     "Meets campus safety standard."),
+)
 
 
 def _luminance_label(lum: float) -> str:
-    if lum < THRESHOLD_CRITICAL:
-        return "Very Dark"
-    elif lum < THRESHOLD_DIM:
-        return "Dim"
-    elif lum < THRESHOLD_ADEQUATE:
-        return "Adequate"
-    elif lum < THRESHOLD_WELL_LIT:
-        return "Well-Lit"
-    else:
-        return "Bright"
+    return _LABELS[bisect_right(_THRESHOLDS, lum)]
 
 
 def _luminance_risk(lum: float) -> str:
     """Convert luminance to lighting risk level."""
-    if lum < THRESHOLD_CRITICAL:
-        return "High"
-    elif lum < THRESHOLD_DIM:
-        return "Medium"
-    else:
-        return "Low"
+    return _RISKS[bisect_right(_THRESHOLDS, lum)]
+
+
+@dataclass(slots=True, frozen=True)
+class VIIRSReading:
+    """
+    One luminance sample. Also readable like the dict sample() used to
+    return (reading['label'], .get(), dict(reading)) so report code that
+    indexes by key keeps working.
+    """
+    luminance_nw:    float   # nW/cm²/sr
+    label:           str     # "Very Dark" / "Dim" / "Adequate" / "Well-Lit" / "Bright"
+    lighting_risk:   str     # "High" / "Medium" / "Low"
+    below_threshold: bool    # True if below safe pedestrian standard (2.0)
+    source:          str     # "viirs_satellite" or "campus_estimate"
+    threshold:       float = THRESHOLD_DIM
+    threshold_label: str   = f"{THRESHOLD_DIM} nW/cm²/sr (safe pedestrian minimum)"
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.__slots__
+
+    def as_dict(self) -> Dict:
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+def _make_reading(luminance: float, source: str) -> VIIRSReading:
+    # Classify the reported (rounded) value so label, risk, below_threshold
+    # and get_lighting_summary's tier always agree with luminance_nw
+    luminance = round(luminance, 3)
+    return VIIRSReading(
+        luminance,
+        _luminance_label(luminance),
+        _luminance_risk(luminance),
+        luminance < THRESHOLD_DIM,
+        source,
+    )
+
+
+def _nodata_sentinel(nodata: Optional[float], dtype) -> float:
+    """
+    Nodata cast through the band dtype so samples compare with plain ==;
+    NaN (never equal to anything) when the band declares none.
+    """
+    if nodata is None:
+        return math.nan
+    return float(np.asarray(nodata).astype(dtype))
 
 
 class VIIRSLoader:
@@ -117,15 +263,40 @@ class VIIRSLoader:
     so the system works without downloading the full satellite dataset.
     """
 
+    # Open raster handles shared by every loader in the process, keyed on
+    # (backend, path), so repeat VIIRSLoader() calls skip the GeoTIFF open.
+    # rasterio/GDAL handles are not safe for concurrent reads from several
+    # threads: the GDAL backend gives other threads their own handle, and
+    # campus points inside the preloaded rasterio AOI never touch it.
+    _raster_cache: Dict[Tuple[str, str], object] = {}
+    _raster_cache_lock = threading.Lock()
+
     def __init__(self, viirs_dir: Path = VIIRS_DIR):
         self.viirs_dir = viirs_dir
         self.raster = None
         self.raster_path = None
         self.has_real_data = False
+        self._rasterio = None   # module handle when the rasterio backend is active
+        # Backend chosen at load time: lat/lon → (row, col), and a pixel reader
+        self._pixel_fn = None
+        self._read_fn = None
+        self._gdal_pool = None  # batch workers, created on first large GDAL batch
+        self._gdal_pool_lock = threading.Lock()
         self._try_load_raster()
+        self._raster_cached = (lru_cache(maxsize=SAMPLE_CACHE_SIZE)(self._read_fn)
+                               if self._read_fn is not None else None)
+        self._estimate_cached = lru_cache(maxsize=SAMPLE_CACHE_SIZE)(self._estimate_luminance)
 
     def _try_load_raster(self):
-        """Attempt to load a VIIRS GeoTIFF from the data/viirs/ directory."""
+        """
+        Attempt to load a VIIRS GeoTIFF from the data/viirs/ directory.
+
+        GDAL's block cache is raised to 512 MB (unless GDAL_CACHEMAX is already
+        set) so nearby samples on a large annual tile hit RAM instead of disk —
+        at the cost of up to 512 MB of process memory once the cache fills.
+        Directory listing on open is also disabled; the tile is a single file,
+        and block decompression is allowed to use every core.
+        """
         if not self.viirs_dir.exists():
             self.viirs_dir.mkdir(parents=True, exist_ok=True)
             print("📡 VIIRS: data/viirs/ created — no satellite data loaded yet")
@@ -155,12 +326,25 @@ class VIIRSLoader:
 
         tif_files = luminance_files  # Use only true luminance files
 
+        # Must be set before GDAL initializes its block cache
+        os.environ.setdefault('GDAL_CACHEMAX', '512')
+        os.environ.setdefault('GDAL_DISABLE_READDIR_ON_OPEN', 'EMPTY_DIR')
+        os.environ.setdefault('GDAL_NUM_THREADS', 'ALL_CPUS')
+
         # Try rasterio first (full GeoTIFF support)
         try:
             import rasterio
+            import rasterio.windows
             self.raster_path = tif_files[0]
-            self.raster = rasterio.open(str(self.raster_path))
+            # sharing=False keeps GDAL's own dataset pool out of it; the
+            # process-wide reuse is handled by _raster_cache
+            self.raster = self._open_shared(
+                'rasterio', self.raster_path,
+                lambda path: self._open_rasterio(rasterio, path))
+            self._rasterio = rasterio
             self.has_real_data = True
+            self._cache_raster_metadata()
+            self._pixel_fn, self._read_fn = self._pixel_rasterio, self._read_rasterio
             print(f"✅ VIIRS: Loaded satellite data — {self.raster_path.name}")
             print(f"   Bounds: {self.raster.bounds}")
             print(f"   Resolution: {self.raster.res}")
@@ -172,10 +356,11 @@ class VIIRSLoader:
         try:
             from osgeo import gdal
             self.raster_path = tif_files[0]
-            self.raster = gdal.Open(str(self.raster_path))
+            self.raster = self._open_shared('gdal', self.raster_path, gdal.Open)
             if self.raster:
                 self.has_real_data = True
                 self._setup_gdal_transform()
+                self._pixel_fn, self._read_fn = self._pixel_gdal, self._read_gdal
                 print(f"✅ VIIRS: Loaded via GDAL — {self.raster_path.name}")
                 return
         except ImportError:
@@ -185,187 +370,333 @@ class VIIRSLoader:
         print("   Install with: pip install rasterio --break-system-packages")
         print("   Falling back to campus luminance estimates")
 
+    @classmethod
+    def _open_shared(cls, backend: str, path: Path, opener):
+        """Return the cached handle for (backend, path), opening it on first use."""
+        key = (backend, str(path))
+        with cls._raster_cache_lock:
+            handle = cls._raster_cache.get(key)
+            if handle is None:
+                handle = opener(str(path))
+                if handle:
+                    cls._raster_cache[key] = handle
+        return handle
+
+    @staticmethod
+    def _open_rasterio(rasterio, path: str):
+        """
+        Open a GeoTIFF at the coarsest overview whose pixels are still within
+        OVERVIEW_MAX_PIXEL_M, so single-pixel reads decompress less data.
+        VIIRS's ~463 m base pixel already exceeds that and opens at full
+        resolution; finer composites with gdaladdo overviews are downsampled.
+        """
+        src = rasterio.open(path, sharing=False)
+        factors = src.overviews(1)
+        if not factors:
+            return src
+
+        # Geographic CRS: degrees → metres (larger axis, conservative)
+        px_m = max(src.res)
+        if src.crs is None or src.crs.is_geographic:
+            px_m *= 111_320
+        level = None
+        for i, factor in enumerate(factors):   # factors ascend: 2, 4, 8, ...
+            if px_m * factor <= OVERVIEW_MAX_PIXEL_M:
+                level = i
+        if level is None:
+            return src
+
+        src.close()
+        return rasterio.open(path, sharing=False, overview_level=level)
+
+    @classmethod
+    def close_all(cls):
+        """Close every shared raster handle (process teardown)."""
+        with cls._raster_cache_lock:
+            handles = list(cls._raster_cache.values())
+            cls._raster_cache.clear()
+        for handle in handles:
+            try:
+                close = getattr(handle, 'close', None)
+                if close is not None:
+                    close()
+            except Exception:
+                pass
+
+    def _cache_raster_metadata(self):
+        """
+        Copy the rasterio transform, extent and nodata onto plain attributes
+        so the per-sample path is arithmetic only.
+        """
+        r = self.raster
+        # Affine (a, b, c, d, e, f): x = a*col + b*row + c, y = d*col + e*row + f
+        (self._affine_a, self._affine_b, self._affine_c,
+         self._affine_d, self._affine_e, self._affine_f) = tuple(r.transform)[:6]
+        b = r.bounds
+        self._rbounds_t = (b.left, b.bottom, b.right, b.top)
+        self._rw, self._rh = r.width, r.height
+        self._rnodata = _nodata_sentinel(r.nodata, r.dtypes[0])
+        self._Window = self._rasterio.windows.Window
+        self._preload_aoi()
+
+    def _preload_aoi(self):
+        """Read the campus AOI window once so campus samples skip GDAL I/O."""
+        self._aoi, self._aoi_r0, self._aoi_c0 = None, 0, 0
+        left, bottom, right, top = CAMPUS_AOI
+        c0 = max(0, math.floor((left - self._affine_c) / self._affine_a))
+        c1 = min(self._rw, math.floor((right - self._affine_c) / self._affine_a) + 1)
+        r0 = max(0, math.floor((top - self._affine_f) / self._affine_e))
+        r1 = min(self._rh, math.floor((bottom - self._affine_f) / self._affine_e) + 1)
+        if r0 >= r1 or c0 >= c1:
+            return  # raster does not cover campus
+        try:
+            self._aoi = self.raster.read(1, window=((r0, r1), (c0, c1)))
+            self._aoi_r0, self._aoi_c0 = r0, c0
+        except Exception:
+            pass
+
     def _setup_gdal_transform(self):
         """Pre-compute inverse geotransform for GDAL raster."""
+        from osgeo import gdal
         gt = self.raster.GetGeoTransform()
         # Store geotransform: (xmin, pixel_width, 0, ymax, 0, -pixel_height)
         self._gdal_gt = gt
+        self._gdal_band = self.raster.GetRasterBand(1)
+        self._gdal_f32 = gdal.GDT_Float32
+        self._gdal_open = gdal.Open
+        # GDAL handles can't be read from several threads at once: the loading
+        # thread uses the shared handle, any other thread opens its own once
+        self._gdal_local = threading.local()
+        self._gdal_local.band = self._gdal_band
+        self._rw, self._rh = self.raster.RasterXSize, self.raster.RasterYSize
+        self._rnodata = _nodata_sentinel(self._gdal_band.GetNoDataValue(), np.float32)
+
+    def _pixel_rasterio(self, lat: float, lon: float) -> Optional[Tuple[int, int]]:
+        """(row, col) of the pixel under lat/lon, or None outside the raster."""
+        # Bounds check — return None if coordinate is outside the raster extent
+        left, bottom, right, top = self._rbounds_t
+        if not (left <= lon <= right and bottom <= lat <= top):
+            return None
 
-    def _sample_rasterio(self, lat: float, lon: float) -> Optional[float]:
-        """Sample VIIRS raster at lat/lon using rasterio."""
-        try:
-            import rasterio
-            from rasterio.transform import rowcol
-
-            # Bounds check — return None if coordinate is outside the raster extent
-            bounds = self.raster.bounds
-            if not (bounds.left <= lon <= bounds.right and
-                    bounds.bottom <= lat <= bounds.top):
-                return None
-
-            row, col = rowcol(self.raster.transform, lon, lat)
+        # VIIRS composites are north-up, so the inverse affine is two divisions
+        col = math.floor((lon - self._affine_c) / self._affine_a)
+        row = math.floor((lat - self._affine_f) / self._affine_e)
 
-            # Validate pixel position is within raster dimensions
-            if row < 0 or col < 0 or row >= self.raster.height or col >= self.raster.width:
-                return None
+        # Validate pixel position is within raster dimensions
+        if row < 0 or col < 0 or row >= self._rh or col >= self._rw:
+            return None
+        return row, col
 
-            data = self.raster.read(1, window=((row, row+1), (col, col+1)))
-            val = float(data[0][0])
+    def _read_rasterio(self, row: int, col: int) -> Optional[float]:
+        """Luminance of one pixel via rasterio, None for nodata/implausible values."""
+        try:
+            # Campus points come straight from the preloaded AOI array
+            aoi = self._aoi
+            r, c = row - self._aoi_r0, col - self._aoi_c0
+            if aoi is not None and 0 <= r < aoi.shape[0] and 0 <= c < aoi.shape[1]:
+                val = float(aoi[r, c])
+            else:
+                # Fresh array per read — a shared out= buffer races across
+                # request threads sampling through the same handle
+                data = self.raster.read(1, window=self._Window(col, row, 1, 1))
+                val = float(data[0, 0])
 
             # VIIRS VNL V2 annual/monthly composite: values are in nW/cm²/sr
             # Typical campus values: 1-20 nW/cm²/sr
             # Nodata is typically -9999 or 65535 (uint16 overflow)
-            nodata = self.raster.nodata
-            if nodata is not None and abs(val - nodata) < 1e-3:
-                return None
-            if val <= 0 or val > 5000:   # Sanity check: 5000 nW is far above any campus
+            # Sanity check: 5000 nW is far above any campus
+            if val == self._rnodata or not (0.0 < val <= 5000.0):
                 return None
-
-            return round(val, 3)
+            return val
         except Exception:
             return None
 
-    def _sample_gdal(self, lat: float, lon: float) -> Optional[float]:
-        """Sample VIIRS raster at lat/lon using GDAL."""
+    def _thread_band(self):
+        """This thread's GDAL band, opening a private dataset on first use."""
+        local = self._gdal_local
+        band = getattr(local, 'band', None)
+        if band is None:
+            local.ds = self._gdal_open(str(self.raster_path))
+            band = local.band = local.ds.GetRasterBand(1)
+        return band
+
+    def _pixel_gdal(self, lat: float, lon: float) -> Optional[Tuple[int, int]]:
+        """(row, col) of the pixel under lat/lon, or None outside the raster."""
+        gt = self._gdal_gt
+        # Convert lat/lon to pixel coordinates
+        px = int((lon - gt[0]) / gt[1])
+        py = int((lat - gt[3]) / gt[5])
+        # Bounds check
+        if px < 0 or py < 0 or px >= self._rw or py >= self._rh:
+            return None
+        return py, px
+
+    def _read_gdal(self, row: int, col: int) -> Optional[float]:
+        """Luminance of one pixel via GDAL, None for nodata/implausible values."""
         try:
-            gt = self._gdal_gt
-            cols = self.raster.RasterXSize
-            rows = self.raster.RasterYSize
-            # Convert lat/lon to pixel coordinates
-            px = int((lon - gt[0]) / gt[1])
-            py = int((lat - gt[3]) / gt[5])
-            # Bounds check
-            if px < 0 or py < 0 or px >= cols or py >= rows:
+            # Raw 4-byte read — no ndarray allocation for a single pixel
+            raw = self._thread_band().ReadRaster(col, row, 1, 1, buf_type=self._gdal_f32)
+            if raw is None:
                 return None
-            band = self.raster.GetRasterBand(1)
-            nodata = band.GetNoDataValue()
-            data = band.ReadAsArray(px, py, 1, 1)
-            if data is None:
+            val = struct.unpack('<f', raw)[0]
+            if val == self._rnodata or not (0.0 < val <= 5000.0):
                 return None
-            val = float(data[0][0])
-            if nodata is not None and abs(val - nodata) < 1e-3:
-                return None
-            return val if (0 < val <= 5000) else None
+            return val
         except Exception:
             return None
 
+    def _sample_raster(self, lat: float, lon: float) -> Optional[float]:
+        """Raster luminance at lat/lon, cached per pixel; None if unavailable."""
+        pixel = self._pixel_fn(lat, lon)
+        return self._raster_cached(*pixel) if pixel is not None else None
+
+    def _sample_cached_span(self, lats: List[float], lons: List[float]) -> List[Optional[float]]:
+        """Cached raster lookups for one slice of a batch."""
+        return [self._sample_raster(lat, lon) for lat, lon in zip(lats, lons)]
+
+    def _sample_gdal_parallel(self, lats: List[float], lons: List[float],
+                              workers: int) -> List[Optional[float]]:
+        """
+        Split a large batch across the loader's worker threads; GDAL releases
+        the GIL while it reads and decompresses, so the chunks' I/O overlaps.
+        The pool is kept for the loader's lifetime, so each worker's private
+        dataset handle is opened once and reused by later batches.
+        """
+        with self._gdal_pool_lock:
+            if self._gdal_pool is None:
+                self._gdal_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1,
+                                                     thread_name_prefix='viirs-gdal')
+            pool = self._gdal_pool
+        edges = np.linspace(0, len(lats), workers + 1).astype(int).tolist()
+        spans = list(zip(edges[:-1], edges[1:]))
+        parts = pool.map(self._sample_cached_span,
+                         [lats[a:b] for a, b in spans],
+                         [lons[a:b] for a, b in spans])
+        return list(chain.from_iterable(parts))
+
     def _estimate_luminance(self, lat: float, lon: float) -> float:
         """
         Estimate luminance from known campus infrastructure data.
         Weighted average of nearby reference points.
         """
-        weights = []
-        values = []
-
-        for ref_lat, ref_lon, radius, lum in CAMPUS_LUMINANCE_ESTIMATES:
-            dist = _haversine(lat, lon, ref_lat, ref_lon)
-            if dist <= radius * 2:  # Sample within 2x the reference radius
-                # Inverse-distance weighting
-                weight = max(0.01, 1.0 / (dist + 0.001))
-                weights.append(weight)
-                values.append(lum)
-
-        if not weights:
+        weighted = _estimate(lat, lon, _REF_LAT_RAD, _REF_LON_RAD, _REF_COS_LAT,
+                             _REF_RADIUS, _REF_LUM)
+        if weighted < 0:
             # Outside all known reference zones — assume dim perimeter
             return 1.5
+        return round(float(weighted), 2)
 
-        weighted = sum(w * v for w, v in zip(weights, values)) / sum(weights)
-        return round(weighted, 2)
-
-    def sample(self, lat: float, lon: float) -> Dict:
+    def sample(self, lat: float, lon: float) -> VIIRSReading:
         """
         Sample nighttime luminance at a given coordinate.
 
-        Returns:
-            {
-              'luminance_nw':    float,   # nW/cm²/sr
-              'label':           str,     # "Very Dark" / "Dim" / "Adequate" / "Well-Lit"
-              'lighting_risk':   str,     # "High" / "Medium" / "Low"
-              'below_threshold': bool,    # True if below safe pedestrian standard (2.0)
-              'source':          str,     # "viirs_satellite" or "campus_estimate"
-              'threshold':       float,   # The threshold used for "safe" classification
-            }
+        Returns a VIIRSReading with luminance_nw, label, lighting_risk,
+        below_threshold, source ("viirs_satellite" or "campus_estimate"),
+        threshold and threshold_label; fields also read by key.
         """
-        luminance = None
-        source = "campus_estimate"
-
-        if self.has_real_data and self.raster is not None:
+        if self._raster_cached is not None:
             # Try satellite data first
-            try:
-                import rasterio
-                luminance = self._sample_rasterio(lat, lon)
-                if luminance is not None:
-                    source = "viirs_satellite"
-            except ImportError:
-                luminance = self._sample_gdal(lat, lon)
-                if luminance is not None:
-                    source = "viirs_satellite"
-
-        if luminance is None:
-            luminance = self._estimate_luminance(lat, lon)
-
-        label        = _luminance_label(luminance)
-        lighting_risk = _luminance_risk(luminance)
-        below_threshold = luminance < THRESHOLD_DIM
-
-        return {
-            'luminance_nw':    round(luminance, 3),
-            'label':           label,
-            'lighting_risk':   lighting_risk,
-            'below_threshold': below_threshold,
-            'source':          source,
-            'threshold':       THRESHOLD_DIM,
-            'threshold_label': f"{THRESHOLD_DIM} nW/cm²/sr (safe pedestrian minimum)",
-        }
+            luminance = self._sample_raster(lat, lon)
+            if luminance is not None:
+                return _make_reading(luminance, "viirs_satellite")
+        return _make_reading(self._estimate_cached(lat, lon), "campus_estimate")
+
+    def _sample_rasterio_batch(self, lats: np.ndarray,
+                               lons: np.ndarray) -> List[Optional[float]]:
+        """
+        Sample many points in one rasterio.sample() pass.
+
+        The dataset's sample() generator reuses GDAL's block cache across
+        points instead of issuing a 1x1 windowed read per location.
+        Points outside the raster extent come back as None.
+        """
+        out: List[Optional[float]] = [None] * len(lats)
+        left, bottom, right, top = self._rbounds_t
+        inside = (lons >= left) & (lons <= right) & (lats >= bottom) & (lats <= top)
+        idx = np.flatnonzero(inside)
+        if not len(idx):
+            return out
+
+        # Walk pixels in row-major order so consecutive samples reuse TIFF tiles;
+        # results are scattered back through idx, so no inverse permutation needed
+        rows = np.floor((lats[idx] - self._affine_f) / self._affine_e)
+        cols = np.floor((lons[idx] - self._affine_c) / self._affine_a)
+        idx = idx[np.lexsort((cols, rows))]
+
+        coords = list(zip(lons[idx].tolist(), lats[idx].tolist()))
+        try:
+            vals = np.fromiter((v[0] for v in self.raster.sample(coords, indexes=1)),
+                               dtype=np.float64, count=len(idx))
+        except Exception:
+            return out
+
+        # Same nodata + sanity check as the scalar samplers, as one mask
+        valid = (vals != self._rnodata) & (vals > 0) & (vals <= 5000)
+        for i, val, ok in zip(idx.tolist(), vals.tolist(), valid.tolist()):
+            if ok:
+                out[i] = val
+        return out
 
     def sample_batch(self, locations: list) -> list:
         """
         Sample luminance for a list of {'lat', 'lon', 'name'} dicts.
-        Returns each dict enriched with luminance data.
+        Returns each dict enriched with its VIIRSReading under 'viirs'.
         """
-        results = []
-        for loc in locations:
-            reading = self.sample(loc['lat'], loc['lon'])
-            results.append({
-                **loc,
-                'viirs': reading
-            })
-        return results
+        if not locations:
+            return []
+        lats = np.fromiter((loc['lat'] for loc in locations), dtype=np.float64,
+                           count=len(locations))
+        lons = np.fromiter((loc['lon'] for loc in locations), dtype=np.float64,
+                           count=len(locations))
+
+        workers = min(os.cpu_count() or 1, len(locations) // PARALLEL_BATCH_MIN)
+        if self._rasterio is not None and self.raster is not None:
+            luminances = self._sample_rasterio_batch(lats, lons)
+        elif self._raster_cached is not None and workers >= 2:
+            luminances = self._sample_gdal_parallel(lats.tolist(), lons.tolist(), workers)
+        elif self._raster_cached is not None:
+            luminances = self._sample_cached_span(lats.tolist(), lons.tolist())
+        else:
+            luminances = [None] * len(locations)
+
+        # Everything the raster didn't cover is estimated in one broadcast
+        sources = ["viirs_satellite"] * len(locations)
+        missing = [i for i, lum in enumerate(luminances) if lum is None]
+        if missing:
+            for i, est in zip(missing, _estimate_batch(lats[missing], lons[missing]).tolist()):
+                luminances[i] = est
+                sources[i] = "campus_estimate"
+
+        return [{**loc, 'viirs': _make_reading(lum, src)}
+                for loc, lum, src in zip(locations, luminances, sources)]
 
     def get_lighting_summary(self, lat: float, lon: float) -> str:
         """
         Returns a plain-English lighting assessment for use in CPTED reports.
         """
         reading = self.sample(lat, lon)
-        lum   = reading['luminance_nw']
-        label = reading['label']
-        source_note = "(satellite-measured)" if reading['source'] == "viirs_satellite" \
+        lum = reading.luminance_nw
+        source_note = "(satellite-measured)" if reading.source == "viirs_satellite" \
                       else "(campus-estimated)"
 
-        if lum < THRESHOLD_CRITICAL:
-            return (f"Critically dark — {lum:.2f} nW/cm²/sr {source_note}. "
-                    f"Well below the {THRESHOLD_DIM} nW/cm²/sr safe pedestrian threshold. "
-                    f"Immediate lighting intervention required.")
-        elif lum < THRESHOLD_DIM:
-            deficit = round(((THRESHOLD_DIM - lum) / THRESHOLD_DIM) * 100)
-            return (f"Inadequate lighting — {lum:.2f} nW/cm²/sr {source_note}. "
-                    f"{deficit}% below the {THRESHOLD_DIM} nW/cm²/sr safe minimum. "
-                    f"Lighting improvement recommended.")
-        elif lum < THRESHOLD_ADEQUATE:
-            return (f"Marginal lighting — {lum:.2f} nW/cm²/sr {source_note}. "
-                    f"Meets minimum standard but below the {THRESHOLD_ADEQUATE} nW/cm²/sr "
-                    f"recommended campus level.")
-        else:
-            return (f"Adequate lighting — {lum:.2f} nW/cm²/sr {source_note}. "
-                    f"Meets campus safety standard.")
+        tier = bisect_right(_SUMMARY_THRESHOLDS, lum)
+        deficit = round(((THRESHOLD_DIM - lum) / THRESHOLD_DIM) * 100) if tier == 1 else 0
+        return _SUMMARY_TMPL[tier].format(lum=lum, src=source_note, deficit=deficit)
 
     def close(self):
-        """Release raster file handle."""
-        if self.has_real_data and self.raster is not None:
-            try:
-                self.raster.close()
-            except Exception:
-                pass
+        """
+        Detach from the shared raster handle and stop any batch workers. Later
+        samples use the campus estimate; the shared handle itself stays open
+        for other loaders until VIIRSLoader.close_all().
+        """
+        self.raster = None
+        self._pixel_fn = self._read_fn = None
+        self._raster_cached = None
+        # Worker threads exit with the pool, releasing their private handles
+        with self._gdal_pool_lock:
+            pool, self._gdal_pool = self._gdal_pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
 
 
 # ── Download helper ───────────────────────────────────────────────────────────
@@ -410,7 +741,7 @@ if __name__ == '__main__':
     ]
     for name, lat, lon in test_locations:
         reading = loader.sample(lat, lon)
-        bar = "█" * int(reading['luminance_nw'])
-        print(f"  {name:<25} {reading['luminance_nw']:>5.2f} nW  "
-              f"[{reading['label']:<12}]  {bar}")
+        bar = "█" * int(reading.luminance_nw)
+        print(f"  {name:<25} {reading.luminance_nw:>5.2f} nW  "
+              f"[{reading.label:<12}]  {bar}")
     loader.close()
\ No newline at end of file